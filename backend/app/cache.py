@@ -0,0 +1,467 @@
+"""
+进程内缓存
+- 参考数据（分类、二级分类、支付方式）几乎不变，启动时加载到内存，
+  数据版本变化后重新加载
+- 数据版本号 + 按版本失效的结果缓存，用于统计类接口
+- 每个缓存记录命中/未命中次数，供 /metrics 输出
+
+数据版本号保存在 SQLite 的 data_versions 表中，由触发器在写入的同一事务中递增，
+多个 worker 进程共享；每个请求最多检查一次全局版本（主键查询），有变化时增量同步
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from .database import Base, SessionLocal, engine as default_engine
+from .models import Category, CategoryItem, PaymentMethod, DataVersion
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """命中统计（不加锁，并发下允许少量误差）"""
+    __slots__ = ("hits", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+
+# 缓存名称 -> 命中统计
+cache_stats: Dict[str, CacheStats] = {}
+
+
+def register_stats(name: str) -> CacheStats:
+    stats = cache_stats[name] = CacheStats()
+    return stats
+
+
+class CategoryRef(NamedTuple):
+    """一级分类"""
+    id: int
+    name: str
+    type: str
+    icon: Optional[str]
+    sort_order: int
+
+
+class CategoryItemRef(NamedTuple):
+    """二级分类"""
+    id: int
+    category_id: int
+    name: str
+    icon: Optional[str]
+    sort_order: int
+
+
+class PaymentMethodRef(NamedTuple):
+    """支付方式"""
+    id: int
+    name: str
+    icon: Optional[str]
+    sort_order: int
+
+
+class ReferenceData(NamedTuple):
+    """一次加载的完整参考数据快照"""
+    categories: Dict[int, CategoryRef]
+    items: Dict[int, CategoryItemRef]
+    payment_methods: Dict[int, PaymentMethodRef]
+
+
+class ReferenceCache:
+    """
+    参考数据缓存
+    - 读取无锁，直接使用当前快照
+    - 快照记录加载时的 reference 数据版本，版本变化（任一 worker 写入）后重新加载
+    - invalidate() 立即丢弃本进程的快照
+    - derived() 缓存由参考数据派生的值（如序列化后的分类树），随版本一起失效
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Optional[ReferenceData] = None
+        self._data_version: Optional[int] = None
+        self._derived: Dict[str, Tuple[int, Any]] = {}
+        # 每次 invalidate() 递增，避免失效前开始的加载结果被保存
+        self._generation = 0
+        self.stats = register_stats("reference")
+        self.derived_stats = register_stats("reference_derived")
+
+    @property
+    def version(self) -> int:
+        """参考数据的共享版本号"""
+        return data_versions.get(REFERENCE_SCOPE)
+
+    @property
+    def updated_at(self) -> Optional[datetime]:
+        """参考数据最后一次变化的时间（各 worker 一致）"""
+        return data_versions.updated_at(REFERENCE_SCOPE)
+
+    def load(self) -> ReferenceData:
+        """从数据库加载参考数据"""
+        generation = self._generation
+        version = self.version
+        db = SessionLocal()
+        try:
+            categories = {
+                r.id: CategoryRef(r.id, r.name, r.type, r.icon, r.sort_order or 0)
+                for r in db.query(
+                    Category.id, Category.name, Category.type, Category.icon, Category.sort_order
+                )
+            }
+            items = {
+                r.id: CategoryItemRef(r.id, r.category_id, r.name, r.icon, r.sort_order or 0)
+                for r in db.query(
+                    CategoryItem.id, CategoryItem.category_id, CategoryItem.name,
+                    CategoryItem.icon, CategoryItem.sort_order
+                )
+            }
+            payment_methods = {
+                r.id: PaymentMethodRef(r.id, r.name, r.icon, r.sort_order or 0)
+                for r in db.query(
+                    PaymentMethod.id, PaymentMethod.name, PaymentMethod.icon, PaymentMethod.sort_order
+                )
+            }
+        finally:
+            db.close()
+
+        data = ReferenceData(categories, items, payment_methods)
+        with self._lock:
+            if self._generation == generation:
+                self._data = data
+                self._data_version = version
+        return data
+
+    def invalidate(self):
+        """写操作提交后调用，立即丢弃本进程的快照"""
+        with self._lock:
+            self._data = None
+            self._derived = {}
+            self._generation += 1
+
+    def derived(self, key: str, build: Callable[[], Any]) -> Any:
+        """获取派生值，不存在或已失效时调用 build() 重新生成"""
+        generation = self._generation
+        version = self.version
+        entry = self._derived.get(key)
+        if entry is not None and entry[0] == version:
+            self.derived_stats.hits += 1
+            return entry[1]
+
+        self.derived_stats.misses += 1
+        value = build()
+        with self._lock:
+            if self._generation == generation:
+                self._derived[key] = (version, value)
+        return value
+
+    @property
+    def data(self) -> ReferenceData:
+        data = self._data
+        if data is None or self._data_version != self.version:
+            self.stats.misses += 1
+            data = self.load()
+        else:
+            self.stats.hits += 1
+        return data
+
+    def category(self, category_id: Optional[int]) -> Optional[CategoryRef]:
+        return self.data.categories.get(category_id)
+
+    def item(self, item_id: Optional[int]) -> Optional[CategoryItemRef]:
+        return self.data.items.get(item_id)
+
+    def payment_method(self, pm_id: Optional[int]) -> Optional[PaymentMethodRef]:
+        return self.data.payment_methods.get(pm_id)
+
+    def category_name(self, category_id: Optional[int]) -> Optional[str]:
+        ref = self.category(category_id)
+        return ref.name if ref else None
+
+    def item_name(self, item_id: Optional[int]) -> Optional[str]:
+        ref = self.item(item_id)
+        return ref.name if ref else None
+
+    def payment_method_name(self, pm_id: Optional[int]) -> Optional[str]:
+        ref = self.payment_method(pm_id)
+        return ref.name if ref else None
+
+
+# 全局参考数据缓存
+reference_cache = ReferenceCache()
+
+
+# 参考数据（分类、二级分类、支付方式）的版本范围
+REFERENCE_SCOPE = "reference"
+# 全局序号: 任一范围递增时同时递增，用于判断是否需要同步
+GLOBAL_SCOPE = "*"
+
+
+def _bump(scope_expr: str, condition: str = "") -> str:
+    """触发器内递增一个范围的版本号，并记录当前全局序号和递增时间"""
+    return f"""
+        INSERT INTO data_versions (scope, version, seq, updated_at)
+        SELECT {scope_expr}, 1, version, CURRENT_TIMESTAMP FROM data_versions WHERE scope = '{GLOBAL_SCOPE}'{condition}
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1, seq = excluded.seq, updated_at = excluded.updated_at;
+    """
+
+
+_BUMP_GLOBAL = f"UPDATE data_versions SET version = version + 1 WHERE scope = '{GLOBAL_SCOPE}';"
+
+VERSION_TRIGGERS = [
+    # 参考数据
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{op.lower()} AFTER {op} ON {table}
+        BEGIN
+            {_BUMP_GLOBAL}
+            {_bump(f"'{REFERENCE_SCOPE}'")}
+        END
+        """
+        for table in ("categories", "category_items", "payment_methods")
+        for op in ("INSERT", "UPDATE", "DELETE")
+    ],
+    # 记录: 所属用户和项目
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_records_version_{op.lower()} AFTER {op} ON records
+        BEGIN
+            {_BUMP_GLOBAL}
+            {"".join(
+                _bump(f"'user:' || {row}.user_id")
+                + _bump(f"'project:' || {row}.project_id", f" AND {row}.project_id IS NOT NULL")
+                for row in rows
+            )}
+        END
+        """
+        for op, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",)))
+    ],
+    # 记录汇总: 只由记录写入递增（项目总额等其他变化不影响），统计推送据此判断是否需要重新聚合；
+    # 每次写入对每个相关用户只递增一次，本进程推送增量后可据此确认没有其他来源的写入
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_records_summary_version_{op.lower()} AFTER {op} ON records
+        BEGIN
+            {_BUMP_GLOBAL}
+            {bumps}
+        END
+        """
+        for op, bumps in (
+            ("INSERT", _bump("'records:' || NEW.user_id")),
+            ("UPDATE", _bump("'records:' || NEW.user_id")
+                + _bump("'records:' || OLD.user_id", " AND OLD.user_id != NEW.user_id")),
+            ("DELETE", _bump("'records:' || OLD.user_id")),
+        )
+    ],
+    # 项目: 项目本身和所属用户
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_projects_version_{op.lower()} AFTER {op} ON projects
+        BEGIN
+            {_BUMP_GLOBAL}
+            {_bump(f"'project:' || {row}.id")}
+            {_bump(f"'user:' || {row}.user_id")}
+        END
+        """
+        for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+    ],
+    # 用户（状态、权限变化）
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_users_version_{op.lower()} AFTER {op} ON users
+        BEGIN
+            {_BUMP_GLOBAL}
+            {_bump(f"'user:' || {row}.id")}
+        END
+        """
+        for op, row in (("UPDATE", "NEW"), ("DELETE", "OLD"))
+    ],
+]
+
+
+def install_data_versions(bind: Engine = default_engine):
+    """
+    创建 data_versions 表和触发器（幂等）
+    旧版本的表补建 updated_at 列，并重建触发器（CREATE TRIGGER IF NOT EXISTS 不会替换旧定义）
+    """
+    Base.metadata.create_all(bind=bind, tables=[DataVersion.__table__])
+    with bind.begin() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(data_versions)"))}
+        if "updated_at" not in columns:
+            conn.execute(text("ALTER TABLE data_versions ADD COLUMN updated_at DATETIME"))
+            # 不知道此前的变化时间，按现在计（客户端多重新验证一次）
+            conn.execute(text("UPDATE data_versions SET updated_at = CURRENT_TIMESTAMP"))
+            for ddl in VERSION_TRIGGERS:
+                name = re.search(r"CREATE TRIGGER IF NOT EXISTS (\w+)", ddl).group(1)
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(
+            f"INSERT OR IGNORE INTO data_versions (scope, version, seq) VALUES ('{GLOBAL_SCOPE}', 0, 0)"
+        ))
+        for ddl in VERSION_TRIGGERS:
+            conn.execute(text(ddl))
+
+
+# 当前请求是否已同步过版本号；None 表示不在请求中（后台任务、脚本），每次读取都同步
+_request_synced: ContextVar[Optional[List[bool]]] = ContextVar("data_versions_synced", default=None)
+
+
+class DataVersions:
+    """
+    共享数据版本号
+    写入由触发器完成（与数据在同一事务中），这里只负责读取:
+    - 每个请求第一次 get() 时读取全局序号，未变化则直接使用本地副本
+    - 有变化时只拉取 seq 大于本地序号的范围
+    - 本进程提交事务后，当前请求的下一次 get() 重新同步
+    """
+
+    def __init__(self, bind: Engine = default_engine):
+        self._lock = threading.Lock()
+        self._bind = bind
+        self._versions: Dict[str, int] = {}
+        self._updated: Dict[str, datetime] = {}
+        self._seq = -1
+
+    def sync(self):
+        """与数据库中的版本号同步"""
+        with self._lock:
+            try:
+                with self._bind.connect() as conn:
+                    seq = conn.execute(
+                        text("SELECT version FROM data_versions WHERE scope = :scope"), {"scope": GLOBAL_SCOPE}
+                    ).scalar()
+                    if seq is None or seq == self._seq:
+                        return
+                    if seq < self._seq:
+                        # 数据库被重建，全量重新加载
+                        self._versions = {}
+                        self._updated = {}
+                        self._seq = -1
+                    rows = conn.execute(
+                        text("SELECT scope, version, updated_at FROM data_versions WHERE seq > :seq"),
+                        {"seq": self._seq}
+                    ).all()
+            except OperationalError as e:
+                # 数据库尚未初始化
+                logger.debug("数据版本同步失败: %s", e)
+                return
+            for scope, version, updated_at in rows:
+                self._versions[scope] = version
+                if updated_at:
+                    self._updated[scope] = datetime.fromisoformat(updated_at).replace(tzinfo=timezone.utc)
+            self._seq = seq
+
+    def get_many(self, scopes) -> Dict[str, int]:
+        """不经过请求同步标记，同步一次后读取多个范围（长连接、后台任务使用）"""
+        self.sync()
+        return {scope: self._versions.get(scope, 0) for scope in scopes}
+
+    def _sync_once(self):
+        synced = _request_synced.get()
+        if synced is None or not synced[0]:
+            self.sync()
+            if synced is not None:
+                synced[0] = True
+
+    def get(self, scope: str) -> int:
+        self._sync_once()
+        return self._versions.get(scope, 0)
+
+    def updated_at(self, scope: str) -> Optional[datetime]:
+        """范围最后一次递增的时间（数据库时钟，UTC），从未递增过时为 None"""
+        self._sync_once()
+        return self._updated.get(scope)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _resync_after_commit(session):
+    """本进程提交后，当前请求的下一次读取重新同步，保证读到自己的写入"""
+    synced = _request_synced.get()
+    if synced is not None:
+        synced[0] = False
+
+
+@contextmanager
+def version_sync_scope():
+    """
+    建立版本同步标记: 范围内（一个请求、后台任务、预热或基准调用）最多同步一次，
+    本进程提交后的下一次读取重新同步；不在任何范围内时每次读取都同步
+    """
+    token = _request_synced.set([False])
+    try:
+        yield
+    finally:
+        _request_synced.reset(token)
+
+
+class DataVersionsMiddleware:
+    """纯 ASGI 中间件: 为每个请求建立版本同步标记"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with version_sync_scope():
+            await self.app(scope, receive, send)
+
+
+class VersionedCache:
+    """按数据版本失效的键值缓存，容量有限，超出时淘汰最久未使用的项"""
+
+    def __init__(self, maxsize: int = 1024, name: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Hashable, Tuple[Any, Any]]" = OrderedDict()
+        self.maxsize = maxsize
+        self.stats = register_stats(name) if name else CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or entry[0] != version:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._items.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, version: Any, value: Any):
+        with self._lock:
+            self._items[key] = (version, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+def project_scope(project_id: int) -> str:
+    """项目数据（项目本身及其关联记录）的版本范围"""
+    return f"project:{project_id}"
+
+
+def user_scope(user_id: int) -> str:
+    """用户数据（用户本身及其记录、项目）的版本范围"""
+    return f"user:{user_id}"
+
+
+def records_scope(user_id: int) -> str:
+    """只包含用户记录的版本范围（统计推送使用）"""
+    return f"records:{user_id}"
+
+
+# 全局数据版本号
+data_versions = DataVersions()
@@ -0,0 +1,103 @@
+"""
+级联删除
+以集合操作（UPDATE/DELETE ... WHERE）删除项目和用户的关联数据，
+避免 ORM 把关联记录逐条加载到内存再逐行更新
+"""
+
+import logging
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Project, Record, User
+from .jobs import JobContext, job_handler
+from .counters import get_user_counter
+
+logger = logging.getLogger(__name__)
+
+# 记录数超过该值的用户在后台分批删除
+BACKGROUND_THRESHOLD = 10000
+# 后台分批删除时每批的记录数
+CHUNK_SIZE = 5000
+
+
+def delete_project(db: Session, project_id: int, purge: bool = False) -> int:
+    """
+    删除项目（调用方负责提交事务）
+    - purge=False: 关联记录保留，project_id 置空（detach）
+    - purge=True:  关联记录一并删除
+    返回受影响的记录数
+    """
+    if purge:
+        stmt = delete(Record).where(Record.project_id == project_id)
+    else:
+        stmt = update(Record).where(Record.project_id == project_id).values(project_id=None)
+    affected = db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+
+    db.execute(
+        delete(Project).where(Project.id == project_id),
+        execution_options={"synchronize_session": False}
+    )
+    return affected
+
+
+def count_user_records(db: Session, user_id: int) -> int:
+    """用户记录数（读取计数器）"""
+    return get_user_counter(db, user_id).record_count
+
+
+def _delete_user_projects_and_user(db: Session, user_id: int):
+    """删除用户的项目和用户本身（其他用户记录若引用这些项目，则 detach）"""
+    project_ids = select(Project.id).where(Project.user_id == user_id).scalar_subquery()
+    options = {"synchronize_session": False}
+    db.execute(
+        update(Record).where(Record.project_id.in_(project_ids)).values(project_id=None),
+        execution_options=options
+    )
+    db.execute(delete(Project).where(Project.user_id == user_id), execution_options=options)
+    db.execute(delete(User).where(User.id == user_id), execution_options=options)
+
+
+def delete_user(db: Session, user_id: int) -> int:
+    """在一个事务中删除用户及其记录、项目（调用方负责提交）"""
+    affected = db.execute(
+        delete(Record).where(Record.user_id == user_id),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    _delete_user_projects_and_user(db, user_id)
+    return affected
+
+
+@job_handler("delete_user", concurrency=1)
+def delete_user_in_background(ctx: JobContext, user_id: int, chunk_size: Optional[int] = None):
+    """
+    后台任务：分批删除大用户（账户已在入队时禁用，阻止新写入）
+    按批删除记录（每批一个事务，避免长时间持有写锁），最后在一个事务中删除项目和用户；
+    重试时从剩余记录继续
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    db = SessionLocal()
+    try:
+        done = ctx.done
+        while True:
+            chunk = select(Record.id).where(Record.user_id == user_id).limit(chunk_size).scalar_subquery()
+            deleted = db.execute(
+                delete(Record).where(Record.id.in_(chunk)),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+            db.commit()
+            if not deleted:
+                break
+            done += deleted
+            ctx.progress(done)
+
+        _delete_user_projects_and_user(db, user_id)
+        db.commit()
+        logger.info("用户 %s 已删除，共删除 %d 条记录", user_id, done)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
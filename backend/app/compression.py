@@ -0,0 +1,208 @@
+"""
+响应压缩
+纯 ASGI 中间件，按 Accept-Encoding 协商 zstd / br / gzip:
+- zstd、br 仅在安装了 zstandard、brotli 时启用，gzip 始终可用
+- 一次性响应小于 COMPRESSION_MIN_SIZE 时不压缩
+- 流式响应（如导出）逐块压缩并刷新，不缓冲整个响应体
+- 已有 Content-Encoding 或内容类型不适合压缩时原样返回
+"""
+
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+# 小于该字节数的响应不压缩
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# gzip 压缩级别（1-9），偏向速度
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml", "image/svg+xml",
+)
+# 事件流需要逐条立即送达，压缩器的缓冲会延迟事件，不压缩
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class GzipCompressor:
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+class ZstdCompressor:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+# 服务端偏好顺序（客户端 q 值相同时）
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+PREFERENCE = ("zstd", "br", "gzip")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """根据 Accept-Encoding 选择编码，不接受任何可用编码时返回 None"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in PREFERENCE:
+        if encoding not in COMPRESSORS:
+            continue
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _set_header(headers: List[Tuple[bytes, bytes]], name: bytes, value: Optional[bytes]):
+    headers[:] = [(k, v) for k, v in headers if k.lower() != name]
+    if value is not None:
+        headers.append((name, value))
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩响应体"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (
+                    _header(headers, b"content-encoding") is not None
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(UNCOMPRESSED_TYPES)
+                    or message["status"] in (204, 304)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # 等到第一个响应体消息再决定是否压缩
+                    start_message = {**message, "headers": headers}
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = start_message["headers"] if start_message else None
+
+            if start_message is not None:
+                if not more_body and len(body) < self.minimum_size:
+                    # 一次性的小响应
+                    await send(start_message)
+                    start_message = None
+                    passthrough = True
+                    await send(message)
+                    return
+
+                compressor = COMPRESSORS[encoding]()
+                _set_header(headers, b"content-encoding", encoding.encode())
+                vary = _header(headers, b"vary")
+                if not vary:
+                    _set_header(headers, b"vary", b"Accept-Encoding")
+                elif b"accept-encoding" not in vary.lower():
+                    _set_header(headers, b"vary", vary + b", Accept-Encoding")
+                if more_body:
+                    _set_header(headers, b"content-length", None)
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+                else:
+                    compressed = compressor.finish(body)
+                    _set_header(headers, b"content-length", str(len(compressed)).encode())
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": compressed})
+                return
+
+            # 流式响应的后续块
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.finish(body)})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,366 @@
+"""
+计数器
+users / records / projects / categories 的总数以及每个用户的记录数、项目数、
+备注字节数、最近活动时间和每日新增记录数，由 SQLite 触发器在写入的同一事务中维护，
+管理统计读取计数器即可，不再 COUNT(*) 全表扫描。
+触发器覆盖所有写入路径（ORM、批量语句、初始化脚本），并定期全量校准。
+平台每日活动（活跃用户、登录、注册、记录写入量）同样由触发器和登录路径累加，
+只增不减，不参与校准
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, text, update
+from sqlalchemy.engine import Engine
+
+from .database import Base, SessionLocal, engine as default_engine
+from .jobs import JobContext, enqueue, job_handler
+from .models import Counter, UserCounter, UserDailyActivity, DailyActivity
+
+logger = logging.getLogger(__name__)
+
+# 全局计数器名称 -> 对应的表
+COUNTED_TABLES = {
+    "users": "users",
+    "records": "records",
+    "projects": "projects",
+    "categories": "categories",
+}
+
+# 数据量估算: 每行的平均存储开销（含索引），备注按实际字节数计
+RECORD_ROW_BYTES = 96
+PROJECT_ROW_BYTES = 160
+
+# 旧库的计数器表需要补充的列
+COUNTER_COLUMNS = {
+    "text_bytes": "INTEGER NOT NULL DEFAULT 0",
+    "last_activity_at": "DATETIME",
+}
+
+TRIGGERS = [
+    # 全局计数
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = '{name}';
+        END
+        """
+        for name, table in COUNTED_TABLES.items()
+    ],
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = '{name}';
+        END
+        """
+        for name, table in COUNTED_TABLES.items()
+    ],
+    # 用户计数
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_users_counter_insert AFTER INSERT ON users
+    BEGIN
+        INSERT OR IGNORE INTO user_counters (user_id, record_count, project_count)
+        VALUES (NEW.id, 0, 0);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_users_counter_delete AFTER DELETE ON users
+    BEGIN
+        DELETE FROM user_counters WHERE user_id = OLD.id;
+    END
+    """,
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_user_counter_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO user_counters (user_id, record_count, project_count)
+            VALUES (NEW.user_id, {1 if column == 'record_count' else 0}, {1 if column == 'project_count' else 0})
+            ON CONFLICT (user_id) DO UPDATE SET {column} = {column} + 1;
+        END
+        """
+        for table, column in (("records", "record_count"), ("projects", "project_count"))
+    ],
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_user_counter_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE user_counters SET {column} = {column} - 1 WHERE user_id = OLD.user_id;
+        END
+        """
+        for table, column in (("records", "record_count"), ("projects", "project_count"))
+    ],
+    # 用户用量: 备注字节数、最近活动时间、每日新增记录数
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_records_usage_insert AFTER INSERT ON records
+    BEGIN
+        INSERT INTO user_counters (user_id, record_count, project_count, text_bytes, last_activity_at)
+        VALUES (NEW.user_id, 0, 0, COALESCE(length(CAST(NEW.remark AS BLOB)), 0),
+                COALESCE(NEW.created_at, datetime('now')))
+        ON CONFLICT (user_id) DO UPDATE SET
+            text_bytes = text_bytes + excluded.text_bytes,
+            last_activity_at = excluded.last_activity_at;
+        INSERT INTO user_daily_activity (user_id, day, records_created)
+        VALUES (NEW.user_id, date(COALESCE(NEW.created_at, 'now')), 1)
+        ON CONFLICT (user_id, day) DO UPDATE SET records_created = records_created + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_records_usage_update AFTER UPDATE ON records
+    BEGIN
+        UPDATE user_counters SET
+            text_bytes = text_bytes - COALESCE(length(CAST(OLD.remark AS BLOB)), 0),
+            last_activity_at = COALESCE(NEW.updated_at, datetime('now'))
+        WHERE user_id = OLD.user_id;
+        UPDATE user_counters SET
+            text_bytes = text_bytes + COALESCE(length(CAST(NEW.remark AS BLOB)), 0)
+        WHERE user_id = NEW.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_records_usage_delete AFTER DELETE ON records
+    BEGIN
+        UPDATE user_counters SET text_bytes = text_bytes - COALESCE(length(CAST(OLD.remark AS BLOB)), 0)
+        WHERE user_id = OLD.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_projects_usage_insert AFTER INSERT ON projects
+    BEGIN
+        UPDATE user_counters SET last_activity_at = COALESCE(NEW.created_at, datetime('now'))
+        WHERE user_id = NEW.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_users_usage_delete AFTER DELETE ON users
+    BEGIN
+        DELETE FROM user_daily_activity WHERE user_id = OLD.id;
+    END
+    """,
+    # 平台每日活动
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_user_daily_activity_insert AFTER INSERT ON user_daily_activity
+    BEGIN
+        INSERT INTO daily_activity (day, active_users) VALUES (NEW.day, 1)
+        ON CONFLICT (day) DO UPDATE SET active_users = active_users + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_users_activity_insert AFTER INSERT ON users
+    BEGIN
+        INSERT INTO daily_activity (day, registrations) VALUES (date(COALESCE(NEW.created_at, 'now')), 1)
+        ON CONFLICT (day) DO UPDATE SET registrations = registrations + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_records_activity_insert AFTER INSERT ON records
+    BEGIN
+        INSERT INTO daily_activity (day, records_created, write_bytes)
+        VALUES (date(COALESCE(NEW.created_at, 'now')), 1,
+                {RECORD_ROW_BYTES} + COALESCE(length(CAST(NEW.remark AS BLOB)), 0))
+        ON CONFLICT (day) DO UPDATE SET
+            records_created = records_created + 1,
+            write_bytes = write_bytes + excluded.write_bytes;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_records_activity_update AFTER UPDATE ON records
+    BEGIN
+        INSERT INTO daily_activity (day, records_updated, write_bytes)
+        VALUES (date('now'), 1, {RECORD_ROW_BYTES} + COALESCE(length(CAST(NEW.remark AS BLOB)), 0))
+        ON CONFLICT (day) DO UPDATE SET
+            records_updated = records_updated + 1,
+            write_bytes = write_bytes + excluded.write_bytes;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_records_activity_delete AFTER DELETE ON records
+    BEGIN
+        INSERT INTO daily_activity (day, records_deleted) VALUES (date('now'), 1)
+        ON CONFLICT (day) DO UPDATE SET records_deleted = records_deleted + 1;
+    END
+    """,
+    *[
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_user_counter_update
+        AFTER UPDATE OF user_id ON {table} WHEN NEW.user_id != OLD.user_id
+        BEGIN
+            UPDATE user_counters SET {column} = {column} - 1 WHERE user_id = OLD.user_id;
+            INSERT INTO user_counters (user_id, record_count, project_count)
+            VALUES (NEW.user_id, {1 if column == 'record_count' else 0}, {1 if column == 'project_count' else 0})
+            ON CONFLICT (user_id) DO UPDATE SET {column} = {column} + 1;
+        END
+        """
+        for table, column in (("records", "record_count"), ("projects", "project_count"))
+    ],
+]
+
+
+def install_counters(bind: Engine = default_engine):
+    """
+    创建计数器表和触发器（幂等）
+    计数器表为新建时做一次全量校准
+    """
+    Base.metadata.create_all(
+        bind=bind,
+        tables=[Counter.__table__, UserCounter.__table__, UserDailyActivity.__table__, DailyActivity.__table__]
+    )
+    with bind.begin() as conn:
+        existing = {row[1] for row in conn.execute(text("PRAGMA table_info(user_counters)"))}
+        added = [name for name in COUNTER_COLUMNS if name not in existing]
+        for name in added:
+            conn.execute(text(f"ALTER TABLE user_counters ADD COLUMN {name} {COUNTER_COLUMNS[name]}"))
+        if conn.execute(text("SELECT COUNT(*) FROM daily_activity")).scalar() == 0:
+            backfill_activity(conn)
+
+        created = 0
+        for name in COUNTED_TABLES:
+            created += conn.execute(
+                text("INSERT OR IGNORE INTO counters (name, value) VALUES (:name, 0)"),
+                {"name": name}
+            ).rowcount
+        for ddl in TRIGGERS:
+            conn.execute(text(ddl))
+    if created or added:
+        reconcile_counters(bind)
+
+
+def backfill_activity(conn):
+    """
+    活动汇总表为空时（新建或从旧版本升级）按现有数据回填
+    已删除的记录和历史登录无法还原，回填结果是下限
+    """
+    conn.execute(text("""
+        INSERT OR IGNORE INTO user_daily_activity (user_id, day, records_created)
+        SELECT user_id, date(created_at), COUNT(*) FROM records
+        WHERE created_at IS NOT NULL
+        GROUP BY user_id, date(created_at)
+    """))
+    conn.execute(text("DELETE FROM daily_activity"))
+    conn.execute(text(f"""
+        INSERT INTO daily_activity (day, active_users, registrations, records_created, write_bytes)
+        SELECT day, SUM(active_users), SUM(registrations), SUM(records_created), SUM(write_bytes)
+        FROM (
+            SELECT day, COUNT(*) AS active_users, 0 AS registrations, 0 AS records_created, 0 AS write_bytes
+            FROM user_daily_activity GROUP BY day
+            UNION ALL
+            SELECT date(created_at), 0, COUNT(*), 0, 0
+            FROM users WHERE created_at IS NOT NULL GROUP BY date(created_at)
+            UNION ALL
+            SELECT date(created_at), 0, 0, COUNT(*),
+                   COUNT(*) * {RECORD_ROW_BYTES} + COALESCE(SUM(length(CAST(remark AS BLOB))), 0)
+            FROM records WHERE created_at IS NOT NULL GROUP BY date(created_at)
+        )
+        GROUP BY day
+    """))
+
+
+def record_login(db, user_id: int):
+    """登录计入当日活跃用户和登录次数，并更新最近活动时间，随调用方的事务提交"""
+    now = datetime.utcnow()
+    day = now.date().isoformat()
+    db.execute(
+        text("""
+            INSERT INTO user_daily_activity (user_id, day, records_created) VALUES (:user_id, :day, 0)
+            ON CONFLICT (user_id, day) DO NOTHING
+        """),
+        {"user_id": user_id, "day": day}
+    )
+    db.execute(
+        text("""
+            INSERT INTO daily_activity (day, logins) VALUES (:day, 1)
+            ON CONFLICT (day) DO UPDATE SET logins = logins + 1
+        """),
+        {"day": day}
+    )
+    db.execute(update(UserCounter).where(UserCounter.user_id == user_id).values(last_activity_at=now))
+
+
+def reconcile_counters(bind: Engine = default_engine) -> dict:
+    """在一个事务中按 COUNT(*) 全量重算计数器，返回发生偏差的计数器"""
+    with bind.begin() as conn:
+        before = dict(conn.execute(select(Counter.name, Counter.value)).all())
+        drift = {}
+        for name, table in COUNTED_TABLES.items():
+            actual = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            if before.get(name) != actual:
+                drift[name] = (before.get(name), actual)
+            conn.execute(
+                text("UPDATE counters SET value = :value WHERE name = :name"),
+                {"name": name, "value": actual}
+            )
+
+        # 最近活动时间无法从现有数据完全还原（如登录），取已有值与记录/项目时间的较大者
+        conn.execute(text("""
+            INSERT OR REPLACE INTO user_counters
+                (user_id, record_count, project_count, text_bytes, last_activity_at)
+            SELECT u.id,
+                   (SELECT COUNT(*) FROM records r WHERE r.user_id = u.id),
+                   (SELECT COUNT(*) FROM projects p WHERE p.user_id = u.id),
+                   (SELECT COALESCE(SUM(length(CAST(r.remark AS BLOB))), 0)
+                    FROM records r WHERE r.user_id = u.id),
+                   MAX(
+                       COALESCE((SELECT last_activity_at FROM user_counters c WHERE c.user_id = u.id), ''),
+                       COALESCE((SELECT MAX(r.updated_at) FROM records r WHERE r.user_id = u.id), ''),
+                       COALESCE((SELECT MAX(p.created_at) FROM projects p WHERE p.user_id = u.id), '')
+                   )
+            FROM users u
+        """))
+        conn.execute(text("UPDATE user_counters SET last_activity_at = NULL WHERE last_activity_at = ''"))
+        conn.execute(text("DELETE FROM user_counters WHERE user_id NOT IN (SELECT id FROM users)"))
+
+    if drift:
+        logger.warning("计数器校准发现偏差: %s", drift)
+    return drift
+
+
+def get_counters(db) -> dict:
+    """读取全局计数器"""
+    return dict(db.execute(select(Counter.name, Counter.value)).all())
+
+
+def get_user_counter(db, user_id: int) -> UserCounter:
+    """读取用户计数器，不存在时返回全 0"""
+    counter = db.get(UserCounter, user_id)
+    return counter or UserCounter(user_id=user_id, record_count=0, project_count=0, text_bytes=0)
+
+
+def estimate_data_size(record_count: int, project_count: int, text_bytes: int) -> int:
+    """估算用户数据占用的字节数"""
+    return record_count * RECORD_ROW_BYTES + project_count * PROJECT_ROW_BYTES + text_bytes
+
+
+@job_handler("reconcile_counters", max_attempts=1)
+def reconcile_counters_job(ctx: JobContext):
+    """后台任务：全量校准计数器"""
+    reconcile_counters()
+
+
+def enqueue_reconcile(db) -> str:
+    """登记一次计数器校准（已有待执行的校准任务时复用），随调用方的事务提交，返回任务 ID"""
+    return enqueue(db, "reconcile_counters", unique=True).id
+
+
+async def reconcile_periodically(interval: float):
+    """
+    定期登记计数器校准任务
+    多个 worker 同时登记时复用同一个待执行的任务，由任务队列执行
+    """
+    def submit():
+        db = SessionLocal()
+        try:
+            enqueue_reconcile(db)
+            db.commit()
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(submit)
+        except Exception:
+            logger.exception("计数器校准任务登记失败")
@@ -3,24 +3,56 @@
 SQLite 数据库连接配置
 """
 
+import logging
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# 数据库路径
+# 数据库路径（目录在首次建立连接时创建，导入本模块不产生文件系统副作用）
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
-os.makedirs(DATA_DIR, exist_ok=True)
 
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(DATA_DIR, 'mobile_ledger.db')}"
+# DB_PATH 可指向其他 SQLite 文件（如压测数据库）
+DB_PATH = os.getenv("DB_PATH") or os.path.join(DATA_DIR, 'mobile_ledger.db')
 
-# 创建数据库引擎
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+
+logger = logging.getLogger(__name__)
+
+# 创建数据库引擎（只解析 URL，不建立连接）
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},  # SQLite 需要
     echo=False  # 开发时设为 True 可打印 SQL
 )
 
+# 写锁被其他连接（或其他 worker 进程）占用时的等待时间
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+@event.listens_for(engine, "do_connect")
+def ensure_data_dir(dialect, conn_rec, cargs, cparams):
+    """建立连接前确保数据库所在目录存在"""
+    os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
+
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL 模式下读写互不阻塞，多个 worker 进程可以同时读取；
+    busy_timeout 让写入在锁被占用时等待而不是立即报 database is locked；
+    auto_vacuum 只对新建的数据库生效（必须在切换 WAL 之前设置），使删除后的空闲页可以增量回收
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -43,9 +75,56 @@ def get_db():
         db.close()
 
 
-def init_db():
+def init_db(attempts: int = 3):
+    """
+    初始化数据库（幂等，应用启动时执行）
+    调用 create_all() 创建所有表，补建缺失的索引，并安装计数器和数据版本触发器
+    多个 worker 同时启动时"先检查后创建"可能冲突，重试时对方已创建完成
+    """
+    from .cache import install_data_versions
+    from .counters import install_counters
+
+    for attempt in range(1, attempts + 1):
+        try:
+            Base.metadata.create_all(bind=engine)
+            merge_duplicate_category_items()
+            # create_all 不会给已存在的表补建索引
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
+            install_counters(engine)
+            install_data_versions(engine)
+            return
+        except OperationalError:
+            if attempt == attempts:
+                raise
+            time.sleep(0.2 * attempt)
+
+
+def merge_duplicate_category_items(bind=None):
     """
-    初始化数据库
-    调用 create_all() 创建所有表
+    创建 uq_category_items_category_name 之前合并同一分类下重名的二级分类:
+    保留 id 最小的一条，记录改为引用保留的行，删除其余行（已有该索引时跳过）
     """
-    Base.metadata.create_all(bind=engine)
+    bind = bind or engine
+    indexes = {index["name"] for index in inspect(bind).get_indexes("category_items")}
+    if "uq_category_items_category_name" in indexes:
+        return
+    with bind.begin() as conn:
+        duplicates = conn.execute(text("""
+            SELECT d.id, k.keep_id, d.category_id, d.name
+            FROM category_items d
+            JOIN (
+                SELECT category_id, name, MIN(id) AS keep_id
+                FROM category_items GROUP BY category_id, name HAVING COUNT(*) > 1
+            ) k ON d.category_id = k.category_id AND d.name = k.name AND d.id != k.keep_id
+        """)).all()
+        for item_id, keep_id, category_id, name in duplicates:
+            logger.warning(
+                "合并重名的二级分类: 分类 %s 下的 %r (id=%s) 合并到 id=%s", category_id, name, item_id, keep_id
+            )
+            conn.execute(
+                text("UPDATE records SET category_item_id = :keep WHERE category_item_id = :dup"),
+                {"keep": keep_id, "dup": item_id}
+            )
+            conn.execute(text("DELETE FROM category_items WHERE id = :dup"), {"dup": item_id})
@@ -0,0 +1,232 @@
+"""
+统计实时推送（SSE）
+每个进程维护订阅者以及每个被订阅用户的当前汇总（全部时间范围，与无筛选的 /statistics/summary 一致）:
+- 订阅时聚合一次，推送 summary 事件
+- 本进程的记录写入提交后调用 record_changed()，按新旧记录计算增量推送 delta 事件，不重新聚合
+- 其他 worker、管理端和后台任务的写入由 records:{id} 数据版本发现:
+  定期同步版本号，变化时重新聚合，与当前汇总不一致才推送 summary 事件重新同步；
+  本进程的写入在推送增量时确认版本号只前进了一步（没有其他来源的写入），直接记为已同步，不重新聚合
+没有订阅者的用户不产生任何开销
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, NamedTuple, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, func, select
+from sqlalchemy.engine import Engine
+
+from .cache import data_versions, records_scope
+from .database import engine as default_engine
+from .models import Record
+from .responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# 检查其他进程写入的间隔（秒）
+SSE_SYNC_SECONDS = float(os.getenv("SSE_SYNC_SECONDS", "2"))
+# 没有事件时发送心跳注释的间隔（秒），避免代理断开空闲连接
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# 单个连接的最长时间（秒），到期后由客户端自动重连；
+# uvicorn 平滑关闭会等待进行中的响应结束，不设上限时事件流连接会阻止进程退出
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "300"))
+# 每个连接未发送事件的上限，超过时丢弃积压并改为推送一次完整汇总
+SSE_QUEUE_SIZE = 100
+
+SUMMARY_FIELDS = ("total_count", "total_amount", "income_count", "income_amount", "expense_count", "expense_amount")
+
+
+class RecordSnapshot(NamedTuple):
+    """计算增量和判断日期/分类筛选所需的记录字段"""
+    id: int
+    type: str
+    amount: Decimal
+    date: datetime
+    category_id: int
+    project_id: Optional[int]
+
+
+def snapshot(record: Record) -> RecordSnapshot:
+    return RecordSnapshot(
+        record.id, record.type, Decimal(record.amount), record.date, record.category_id, record.project_id
+    )
+
+
+def compute_summary(user_id: int, bind: Engine = default_engine) -> Dict[str, Decimal]:
+    """全部时间范围的汇总（金额为 Decimal，便于精确累加增量）"""
+    with bind.connect() as conn:
+        row = conn.execute(select(
+            func.count(Record.id),
+            func.coalesce(func.sum(Record.amount), 0),
+            func.count(case((Record.type == 'income', Record.id))),
+            func.coalesce(func.sum(case((Record.type == 'income', Record.amount), else_=0)), 0),
+            func.count(case((Record.type == 'expense', Record.id))),
+            func.coalesce(func.sum(case((Record.type == 'expense', Record.amount), else_=0)), 0),
+        ).where(Record.user_id == user_id)).one()
+    return {
+        name: Decimal(value) if name.endswith("_amount") else value
+        for name, value in zip(SUMMARY_FIELDS, row)
+    }
+
+
+def summary_delta(old: Optional[RecordSnapshot], new: Optional[RecordSnapshot]) -> Dict[str, Decimal]:
+    """一条记录从 old 变为 new（新增时 old 为 None，删除时 new 为 None）对汇总的影响"""
+    delta = {name: Decimal(0) if name.endswith("_amount") else 0 for name in SUMMARY_FIELDS}
+    for record, sign in ((old, -1), (new, 1)):
+        if record is None:
+            continue
+        delta["total_count"] += sign
+        delta["total_amount"] += sign * record.amount
+        if record.type in ("income", "expense"):
+            delta[f"{record.type}_count"] += sign
+            delta[f"{record.type}_amount"] += sign * record.amount
+    return delta
+
+
+def render_summary(values: Dict[str, Decimal]) -> dict:
+    """与 /statistics/summary 相同的结构（金额为浮点数）"""
+    result = {name: float(value) if name.endswith("_amount") else value for name, value in values.items()}
+    result["net_amount"] = float(values["income_amount"] - values["expense_amount"])
+    return result
+
+
+def render_record(record: Optional[RecordSnapshot]) -> Optional[dict]:
+    if record is None:
+        return None
+    return {
+        "id": record.id,
+        "type": record.type,
+        "amount": float(record.amount),
+        "date": record.date.strftime("%Y-%m-%d"),
+        "category_id": record.category_id,
+        "project_id": record.project_id,
+    }
+
+
+class StatsStream:
+    """进程内的订阅者管理和推送（只在事件循环线程中调用）"""
+
+    def __init__(self, bind: Engine = default_engine, sync_seconds: float = SSE_SYNC_SECONDS):
+        self.bind = bind
+        self.sync_seconds = sync_seconds
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._summaries: Dict[int, Dict[str, Decimal]] = {}
+        self._versions: Dict[int, int] = {}
+        # 每个用户本进程推送过的增量次数，重新聚合期间有增量时放弃该次结果
+        self._generations: Counter = Counter()
+        self._event_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def start(self):
+        """启动跨进程变更检查（lifespan 中调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def subscribe(self, user_id: int) -> asyncio.Queue:
+        """订阅用户的统计变更，返回的队列中是已编码的 SSE 事件"""
+        queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        if user_id in self._summaries:
+            self._put(user_id, queue, self._encode("summary", render_summary(self._summaries[user_id])))
+        else:
+            scope = records_scope(user_id)
+            versions = await run_in_threadpool(data_versions.get_many, [scope])
+            await self._refresh(user_id, versions[scope], force=True)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+            self._summaries.pop(user_id, None)
+            self._versions.pop(user_id, None)
+            self._generations.pop(user_id, None)
+
+    def record_changed(self, user_id: int, old: Optional[RecordSnapshot], new: Optional[RecordSnapshot]):
+        """记录写入提交后调用，推送增量；用户没有订阅者时立即返回"""
+        if user_id not in self._subscribers:
+            return
+        self._generations[user_id] += 1
+        summary = self._summaries.get(user_id)
+        if summary is None:
+            # 初始汇总尚未完成，由下一次检查重新同步
+            return
+        delta = summary_delta(old, new)
+        for name, value in delta.items():
+            summary[name] += value
+        # 提交后版本号正好前进一步说明只有这次写入，增量已覆盖，检查时不必重新聚合；
+        # 否则（并发写入或其他来源）保持原版本号，由下一次检查重新聚合
+        scope = records_scope(user_id)
+        known = self._versions.get(user_id)
+        if known is not None and data_versions.get_many([scope])[scope] == known + 1:
+            self._versions[user_id] = known + 1
+        self._broadcast(user_id, self._encode("delta", {
+            "delta": render_summary(delta),
+            "summary": render_summary(summary),
+            "record": render_record(new),
+            "previous": render_record(old),
+        }))
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            if not self._subscribers:
+                continue
+            try:
+                users = list(self._subscribers)
+                versions = await run_in_threadpool(data_versions.get_many, [records_scope(u) for u in users])
+                for user_id in users:
+                    version = versions[records_scope(user_id)]
+                    if user_id in self._subscribers and version != self._versions.get(user_id):
+                        await self._refresh(user_id, version)
+            except Exception:
+                logger.exception("统计推送同步失败")
+
+    async def _refresh(self, user_id: int, version: int, force: bool = False):
+        """重新聚合；与当前汇总不一致（或 force）时推送 summary 事件"""
+        generation = self._generations[user_id]
+        summary = await run_in_threadpool(compute_summary, user_id, self.bind)
+        if user_id not in self._subscribers or self._generations[user_id] != generation:
+            return
+        self._versions[user_id] = version
+        if force or summary != self._summaries.get(user_id):
+            self._summaries[user_id] = summary
+            self._broadcast(user_id, self._encode("summary", render_summary(summary)))
+
+    def _encode(self, event: str, data: dict) -> bytes:
+        self._event_id += 1
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (self._event_id, event.encode(), dumps(data))
+
+    def _broadcast(self, user_id: int, message: bytes):
+        for queue in self._subscribers.get(user_id, ()):
+            self._put(user_id, queue, message)
+
+    def _put(self, user_id: int, queue: asyncio.Queue, message: bytes):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # 客户端读取太慢: 丢弃积压，改为推送一次完整汇总
+            while not queue.empty():
+                queue.get_nowait()
+            if user_id in self._summaries:
+                queue.put_nowait(self._encode("summary", render_summary(self._summaries[user_id])))
+
+
+stats_stream = StatsStream()
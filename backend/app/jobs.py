@@ -0,0 +1,330 @@
+"""
+后台任务队列
+任务持久化在 jobs 表中，多个 worker 进程共享，重启后继续执行:
+- enqueue() 随调用方的事务写入任务，提交后唤醒本进程的执行器，处理请求无需等待任务完成
+- 执行器用一条 UPDATE 原子地领取任务并设置租约，执行期间定期续约；
+  worker 退出后租约到期的任务会被其他 worker 重新领取
+- 失败按指数退避重试，达到 max_attempts 后标记为 failed
+- JOB_CONCURRENCY 限制本进程同时执行的任务数，注册时的 concurrency 限制同一类型在所有进程中的并发数
+任务处理函数是同步函数（数据库操作），在线程池中执行
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, delete, event, func, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .cache import version_sync_scope
+from .database import SessionLocal, engine as default_engine
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# 本进程同时执行的任务数，0 表示本进程不执行任务（只入队）
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+# 没有唤醒通知时轮询新任务的间隔（秒），其他进程入队的任务靠轮询发现
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# 任务租约时长（秒），执行中的任务每次轮询续约
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# 第 n 次失败后等待 JOB_RETRY_BASE_SECONDS * 2^(n-1) 秒再重试
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+# 已结束任务的保留天数
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+# 清理已结束任务的间隔（秒）
+PRUNE_INTERVAL = 3600
+
+
+class JobKind(NamedTuple):
+    func: Callable
+    concurrency: int
+    max_attempts: int
+
+
+_kinds: Dict[str, JobKind] = {}
+
+
+def job_handler(kind: str, concurrency: int = 1, max_attempts: int = 3):
+    """
+    注册任务处理函数: func(ctx: JobContext, **payload)
+    处理函数可能被重试或在 worker 退出后重新执行，需要幂等
+    """
+    def decorator(func: Callable) -> Callable:
+        _kinds[kind] = JobKind(func, concurrency, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(db: Session, kind: str, total: int = 0, unique: bool = False, **payload) -> Job:
+    """
+    在调用方的事务中登记任务，提交后执行
+    unique=True 时已有相同类型和参数、尚未开始执行的任务则直接返回该任务
+    （执行中的任务可能已读到旧数据，不复用）
+    """
+    if kind not in _kinds:
+        raise ValueError(f"未注册的任务类型: {kind}")
+    data = json.dumps(payload, sort_keys=True)
+    now = datetime.utcnow()
+    if unique:
+        existing = db.query(Job).filter(
+            Job.kind == kind, Job.payload == data, Job.status == "pending"
+        ).first()
+        # 在调用方的事务中更新复用的任务以取得写锁: 执行器领取该任务要等调用方提交，
+        # 不会在调用方的写入（autoflush=False，提交时才写入）之前执行；期间已被领取则登记新任务
+        if existing and db.execute(
+            update(Job).where(Job.id == existing.id, Job.status == "pending").values(run_after=now)
+        ).rowcount:
+            db.info["jobs_enqueued"] = True
+            return existing
+    job = Job(
+        id=uuid.uuid4().hex, kind=kind, payload=data, status="pending",
+        attempts=0, max_attempts=_kinds[kind].max_attempts, total=total, done=0,
+        run_after=now, created_at=now
+    )
+    db.add(job)
+    db.flush()
+    db.info["jobs_enqueued"] = True
+    return job
+
+
+def retry(db: Session, job: Job):
+    """把失败的任务重新置为待执行并重新计算重试次数，随调用方的事务提交"""
+    job.status = "pending"
+    job.attempts = 0
+    job.run_after = datetime.utcnow()
+    job.finished_at = None
+    db.info["jobs_enqueued"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _notify_after_commit(session):
+    """提交了新任务时唤醒本进程的执行器"""
+    if session.info.pop("jobs_enqueued", False):
+        job_runner.notify()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _clear_after_rollback(session):
+    session.info.pop("jobs_enqueued", None)
+
+
+def count_by_status(bind: Engine = default_engine) -> dict:
+    """各状态的任务数"""
+    with bind.connect() as conn:
+        return dict(conn.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+
+
+class ClaimedJob(NamedTuple):
+    id: str
+    kind: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+    total: int
+    done: int
+
+
+class JobContext:
+    """传给处理函数: 任务 ID、上次执行留下的进度，以及进度上报"""
+
+    def __init__(self, runner: "JobRunner", job: ClaimedJob):
+        self._runner = runner
+        self.job_id = job.id
+        self.attempt = job.attempts
+        self.total = job.total
+        self.done = job.done
+
+    def progress(self, done: int, total: Optional[int] = None):
+        """上报进度并续约"""
+        self.done = done
+        values = {"done": done, "locked_until": datetime.utcnow() + timedelta(seconds=self._runner.lease_seconds)}
+        if total is not None:
+            self.total = values["total"] = total
+        with self._runner.bind.begin() as conn:
+            conn.execute(update(Job).where(
+                Job.id == self.job_id, Job.locked_by == self._runner.worker_id
+            ).values(**values))
+
+
+def _run_handler(func: Callable, ctx: JobContext, payload: dict):
+    """整个任务作为一个版本同步范围，避免每次读取缓存都查询数据版本"""
+    with version_sync_scope():
+        func(ctx, **payload)
+
+
+class JobRunner:
+    """在事件循环中调度任务，处理函数在线程池中执行"""
+
+    def __init__(self, bind: Engine = default_engine, concurrency: int = JOB_CONCURRENCY,
+                 poll_seconds: float = JOB_POLL_SECONDS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.bind = bind
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._running_kinds: Counter = Counter()
+        self._last_prune: Optional[float] = None
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def start(self):
+        """在事件循环中启动调度（lifespan 中调用）"""
+        if self._task is not None or self.concurrency <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10):
+        """停止领取新任务，等待执行中的任务结束；超时未结束的任务租约到期后由其他 worker 接手"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        if self._running:
+            await asyncio.wait(list(self._running.values()), timeout=timeout)
+        self._loop = None
+
+    def notify(self):
+        """唤醒调度（可在任意线程调用）"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await run_in_threadpool(self._housekeeping)
+                await self._dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("任务调度失败")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self):
+        while self.running < self.concurrency:
+            kinds = [kind for kind, spec in _kinds.items() if self._running_kinds[kind] < spec.concurrency]
+            job = await run_in_threadpool(self._claim, kinds) if kinds else None
+            if job is None:
+                return
+            self._running_kinds[job.kind] += 1
+            task = asyncio.create_task(self._execute(job))
+            self._running[job.id] = task
+
+    def _claim(self, kinds: list) -> Optional[ClaimedJob]:
+        """
+        原子地领取一个可执行的任务: 到期的 pending 任务，或租约已过期的 running 任务；
+        同一类型在所有进程中执行中的任务数不超过注册的 concurrency
+        """
+        now = datetime.utcnow()
+        ready = or_(
+            and_(Job.status == "pending", Job.run_after <= now),
+            and_(Job.status == "running", Job.locked_until < now, Job.attempts < Job.max_attempts),
+        )
+        # 先用只读查询筛出有待执行任务的类型，空闲时轮询不占用写锁
+        with self.bind.connect() as conn:
+            ready_kinds = set(conn.execute(
+                select(Job.kind).where(ready, Job.kind.in_(kinds)).distinct()
+            ).scalars())
+        busy = Job.__table__.alias("busy")
+        for kind in kinds:
+            if kind not in ready_kinds:
+                continue
+            running = select(func.count()).select_from(busy).where(
+                busy.c.kind == kind, busy.c.status == "running", busy.c.locked_until >= now
+            ).scalar_subquery()
+            candidate = select(Job.id).where(
+                Job.kind == kind, ready, running < _kinds[kind].concurrency
+            ).order_by(Job.run_after, Job.created_at).limit(1).scalar_subquery()
+            with self.bind.begin() as conn:
+                row = conn.execute(
+                    update(Job).where(Job.id == candidate).values(
+                        status="running", attempts=Job.attempts + 1, locked_by=self.worker_id,
+                        locked_until=now + timedelta(seconds=self.lease_seconds),
+                        started_at=func.coalesce(Job.started_at, now)
+                    ).returning(Job.id, Job.payload, Job.attempts, Job.max_attempts, Job.total, Job.done)
+                ).first()
+            if row is not None:
+                return ClaimedJob(row.id, kind, json.loads(row.payload), row.attempts,
+                                  row.max_attempts, row.total, row.done)
+        return None
+
+    async def _execute(self, job: ClaimedJob):
+        try:
+            await run_in_threadpool(_run_handler, _kinds[job.kind].func, JobContext(self, job), job.payload)
+        except Exception as e:
+            logger.exception("任务 %s (%s) 第 %d 次执行失败", job.id, job.kind, job.attempts)
+            await run_in_threadpool(self._finish, job, f"{type(e).__name__}: {e}")
+        else:
+            await run_in_threadpool(self._finish, job, None)
+        finally:
+            self._running.pop(job.id, None)
+            self._running_kinds[job.kind] -= 1
+            self.notify()
+
+    def _finish(self, job: ClaimedJob, error: Optional[str]):
+        """记录执行结果；租约已被其他 worker 接手时不覆盖"""
+        now = datetime.utcnow()
+        values = {"locked_by": None, "locked_until": None, "error": error}
+        if error is None:
+            values.update(status="succeeded", finished_at=now)
+        elif job.attempts < job.max_attempts:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            values.update(status="pending", run_after=now + timedelta(seconds=delay))
+        else:
+            values.update(status="failed", finished_at=now)
+        with self.bind.begin() as conn:
+            conn.execute(update(Job).where(Job.id == job.id, Job.locked_by == self.worker_id).values(**values))
+
+    def _housekeeping(self):
+        """续约执行中的任务，回收无法再重试的过期任务，定期清理已结束的任务"""
+        now = datetime.utcnow()
+        expired = and_(Job.status == "running", Job.locked_until < now, Job.attempts >= Job.max_attempts)
+        with self.bind.connect() as conn:
+            has_expired = conn.execute(select(Job.id).where(expired).limit(1)).first() is not None
+        prune = self._last_prune is None or time.monotonic() - self._last_prune >= PRUNE_INTERVAL
+        if not (self._running or has_expired or prune):
+            return
+
+        with self.bind.begin() as conn:
+            if self._running:
+                conn.execute(update(Job).where(
+                    Job.locked_by == self.worker_id, Job.status == "running"
+                ).values(locked_until=now + timedelta(seconds=self.lease_seconds)))
+            if has_expired:
+                conn.execute(update(Job).where(expired).values(
+                    status="failed", finished_at=now, locked_by=None, locked_until=None,
+                    error=func.coalesce(Job.error, "执行中的 worker 已退出")
+                ))
+            if prune:
+                self._last_prune = time.monotonic()
+                pruned = conn.execute(delete(Job).where(
+                    Job.status.in_(("succeeded", "failed")),
+                    Job.finished_at < now - timedelta(days=JOB_RETENTION_DAYS)
+                )).rowcount
+                if pruned:
+                    logger.info("已清理 %d 个过期任务", pruned)
+
+
+job_runner = JobRunner()
@@ -3,16 +3,110 @@ MyLedger 后端 API
 移动账本后端服务
 """
 
-from fastapi import FastAPI
+import time
+
+# 模块导入耗时（冷启动的一部分），启动完成时与各阶段耗时一并记录
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager, contextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # 导入路由
 from .routers import auth, categories, records, projects, statistics, admin
+from .cache import reference_cache, DataVersionsMiddleware
+from .compression import CompressionMiddleware
+from .database import engine, init_db
+from .events import stats_stream
+from . import counters, maintenance
+from .jobs import job_runner
+from .metrics import MetricsMiddleware, metrics, instrument_engine, register_default_collectors
+from .profiler import SQL_PROFILE, SQLProfilerMiddleware, install_profiler
+from .responses import FastJSONResponse
+from .warmup import precompile_statements
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 计数器全量校准间隔（秒）
+COUNTER_RECONCILE_SECONDS = float(os.getenv("COUNTER_RECONCILE_SECONDS", "3600"))
+# 启动时预热高频语句，STARTUP_WARMUP=0 关闭
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") != "0"
+
+# 各启动阶段耗时（秒）
+startup_timings = {}
+
+
+@contextmanager
+def startup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = time.perf_counter() - start
+
+
+async def report_bcrypt_cost():
+    """报告当前 bcrypt 代价因子下的单次哈希耗时（后台执行，不阻塞启动）"""
+    elapsed = await auth.run_bcrypt(auth.measure_hash_time, auth.BCRYPT_ROUNDS, 1)
+    logger.info("bcrypt cost=%s, 单次哈希耗时 %.1f ms", auth.BCRYPT_ROUNDS, elapsed)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    启动: 建表/迁移（含连接 PRAGMA、计数器和数据版本触发器）-> 加载参考数据缓存 -> 预热高频语句，
+    然后启动后台任务执行器和计数器定期校准；bcrypt 耗时测量放到后台
+    """
+    started = time.perf_counter()
+    with startup_phase("schema"):
+        init_db()
+    with startup_phase("reference_cache"):
+        data = reference_cache.load()
+    logger.info(
+        "参考数据缓存已加载: %d 个分类, %d 个二级分类, %d 个支付方式",
+        len(data.categories), len(data.items), len(data.payment_methods)
+    )
+    if STARTUP_WARMUP:
+        with startup_phase("warmup"):
+            warmed = await precompile_statements()
+        logger.info("已预热 %d 个高频接口的语句", warmed)
+    startup_timings["total"] = time.perf_counter() - started
+    logger.info(
+        "启动完成: 导入 %.1f ms, %s",
+        startup_timings["import"] * 1000,
+        ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in startup_timings.items() if name != "import")
+    )
+
+    job_runner.start()
+    stats_stream.start()
+    tasks = [
+        asyncio.create_task(counters.reconcile_periodically(COUNTER_RECONCILE_SECONDS)),
+        asyncio.create_task(report_bcrypt_cost()),
+        asyncio.create_task(maintenance.maintain_periodically()),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await stats_stream.stop()
+        await job_runner.stop()
+
 
 app = FastAPI(
     title="MyLedger API",
     description="移动账本后端 API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS 配置 - 允许所有来源（开发环境）
@@ -24,6 +118,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（gzip，安装 brotli / zstandard 后自动支持 br / zstd）
+app.add_middleware(CompressionMiddleware)
+
+# 每个请求最多同步一次共享数据版本号（多 worker 缓存一致）
+app.add_middleware(DataVersionsMiddleware)
+
+# 运行指标（/metrics），METRICS_ENABLED=0 关闭
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    register_default_collectors(engine)
+    metrics.register(
+        "myledger_startup_seconds", "gauge", "Time spent in each startup phase",
+        lambda: {(("phase", name),): round(seconds, 6) for name, seconds in startup_timings.items()}
+    )
+
+# 请求级 SQL 分析（SQL_PROFILE=1 开启，开发和测试环境使用）
+if SQL_PROFILE:
+    app.add_middleware(SQLProfilerMiddleware)
+    install_profiler(engine)
+
 # 注册路由
 app.include_router(auth.router)
 app.include_router(categories.router)
@@ -42,6 +158,13 @@ async def health():
     }
 
 
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        """Prometheus 文本格式的运行指标"""
+        return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/")
 async def root():
     """根路径返回版本信息"""
@@ -52,6 +175,9 @@ async def root():
     }
 
 
+startup_timings["import"] = time.perf_counter() - IMPORT_STARTED
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=888)
@@ -0,0 +1,238 @@
+"""
+SQLite 例行维护
+- optimize: 近似 ANALYZE（analysis_limit 限制每个索引扫描的行数）后执行 PRAGMA optimize，
+  让查询规划器基于当前数据分布选择索引
+- vacuum: PRAGMA incremental_vacuum 分批把空闲页归还给文件系统；
+  需要 auto_vacuum=INCREMENTAL（新建的数据库在连接时设置，已有数据库执行一次 full_vacuum() 转换）
+- checkpoint: PRAGMA wal_checkpoint(TRUNCATE) 把 WAL 写回数据库并截断 WAL 文件
+- integrity_check: PRAGMA integrity_check，发现问题时记录错误并使任务失败
+
+每项作为一个 db_maintenance 后台任务执行（所有进程中同时只执行一个），
+maintain_periodically() 按各自的间隔登记；是否到期按 maintenance_runs 表中该项最近一次登记的时间判断，
+多个 worker 或重启后都不会重复执行（jobs 表中已结束的任务会被清理，不能用来判断）。
+每项成功完成的时间也记录在 maintenance_runs 中。命令行入口见 backend/maintenance.py
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection, Engine
+
+from .database import SessionLocal, engine as default_engine
+from .jobs import JobContext, enqueue, job_handler
+from .models import MaintenanceRun
+
+logger = logging.getLogger(__name__)
+
+# 各项维护的执行间隔（秒），0 表示不自动执行
+MAINTENANCE_INTERVALS = {
+    "optimize": float(os.getenv("MAINTENANCE_OPTIMIZE_SECONDS", "21600")),
+    "vacuum": float(os.getenv("MAINTENANCE_VACUUM_SECONDS", "86400")),
+    "checkpoint": float(os.getenv("MAINTENANCE_CHECKPOINT_SECONDS", "900")),
+    "integrity_check": float(os.getenv("MAINTENANCE_INTEGRITY_SECONDS", "604800")),
+}
+# ANALYZE 时每个索引最多扫描的行数（近似统计，大库上也只需毫秒级）
+MAINTENANCE_ANALYSIS_LIMIT = int(os.getenv("MAINTENANCE_ANALYSIS_LIMIT", "1000"))
+# 检查是否有到期维护的间隔（秒）
+MAINTENANCE_CHECK_SECONDS = 60
+# 每批回收的页数，批次之间释放写锁，避免长时间阻塞写入
+VACUUM_BATCH_PAGES = 1024
+# integrity_check 最多报告的问题数
+INTEGRITY_MAX_ERRORS = 100
+
+
+class SpaceStats(NamedTuple):
+    """数据库空间占用"""
+    db_bytes: int
+    wal_bytes: int
+    page_size: int
+    page_count: int
+    freelist_count: int
+    auto_vacuum: int  # 0 NONE / 1 FULL / 2 INCREMENTAL
+
+
+def _pragma(conn: Connection, statement: str) -> list:
+    result = conn.exec_driver_sql(f"PRAGMA {statement}")
+    return result.all() if result.returns_rows else []
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def space_stats(conn: Connection) -> SpaceStats:
+    path = conn.engine.url.database
+    return SpaceStats(
+        _file_size(path),
+        _file_size(f"{path}-wal"),
+        _pragma(conn, "page_size")[0][0],
+        _pragma(conn, "page_count")[0][0],
+        _pragma(conn, "freelist_count")[0][0],
+        _pragma(conn, "auto_vacuum")[0][0],
+    )
+
+
+def optimize(conn: Connection) -> str:
+    _pragma(conn, f"analysis_limit={MAINTENANCE_ANALYSIS_LIMIT}")
+    conn.exec_driver_sql("ANALYZE")
+    _pragma(conn, "optimize")
+    tables = conn.exec_driver_sql("SELECT count(DISTINCT tbl) FROM sqlite_stat1").scalar()
+    return f"已分析 {tables} 个表"
+
+
+def vacuum(conn: Connection) -> str:
+    if _pragma(conn, "auto_vacuum")[0][0] != 2:
+        free = _pragma(conn, "freelist_count")[0][0]
+        logger.warning(
+            "数据库未启用 auto_vacuum=INCREMENTAL，跳过增量回收（%d 个空闲页）；"
+            "执行 python maintenance.py --full-vacuum 转换", free
+        )
+        return f"未启用增量回收，{free} 个空闲页"
+    pages = 0
+    free = _pragma(conn, "freelist_count")[0][0]
+    while free:
+        # 每次执行是一个独立的事务
+        _pragma(conn, f"incremental_vacuum({VACUUM_BATCH_PAGES})")
+        remaining = _pragma(conn, "freelist_count")[0][0]
+        if remaining >= free:
+            # 并发写入产生新空闲页的速度不低于回收速度，留到下次
+            break
+        pages += free - remaining
+        free = remaining
+    return f"回收 {pages} 页"
+
+
+def checkpoint(conn: Connection) -> str:
+    busy, log, checkpointed = _pragma(conn, "wal_checkpoint(TRUNCATE)")[0]
+    if busy:
+        # 有读取中的连接时无法截断，已写回的部分在下次写入时复用
+        return f"WAL {log} 页，写回 {checkpointed} 页（有连接占用，未截断）"
+    return f"WAL {log} 页已写回并截断"
+
+
+def integrity_check(conn: Connection) -> str:
+    problems = [row[0] for row in _pragma(conn, f"integrity_check({INTEGRITY_MAX_ERRORS})")]
+    if problems != ["ok"]:
+        for problem in problems:
+            logger.error("数据库完整性检查: %s", problem)
+        raise RuntimeError(f"完整性检查发现 {len(problems)} 个问题: {problems[0]}")
+    return "ok"
+
+
+TASKS: Dict[str, Callable[[Connection], str]] = {
+    "optimize": optimize,
+    "vacuum": vacuum,
+    "checkpoint": checkpoint,
+    "integrity_check": integrity_check,
+}
+
+
+def _record_run(conn, task: str, **values):
+    """更新 maintenance_runs 中该项的时间"""
+    conn.execute(
+        insert(MaintenanceRun).values(task=task, **values)
+        .on_conflict_do_update(index_elements=["task"], set_=values)
+    )
+
+
+def run_task(name: str, bind: Engine = default_engine) -> dict:
+    """执行一项维护，记录耗时和释放的空间，成功后记录完成时间"""
+    started = time.perf_counter()
+    with bind.connect() as conn:
+        # 自动提交: VACUUM / checkpoint 不能在事务中执行，增量回收每批单独提交
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        before = space_stats(conn)
+        detail = TASKS[name](conn)
+        after = space_stats(conn)
+    with bind.begin() as conn:
+        _record_run(conn, name, succeeded_at=datetime.utcnow())
+    elapsed = time.perf_counter() - started
+    reclaimed = before.db_bytes + before.wal_bytes - after.db_bytes - after.wal_bytes
+    logger.info(
+        "数据库维护 %s 完成: %s, 耗时 %.1f ms, 释放 %d 字节（数据库 %d → %d, WAL %d → %d, 空闲页 %d → %d）",
+        name, detail, elapsed * 1000, reclaimed,
+        before.db_bytes, after.db_bytes, before.wal_bytes, after.wal_bytes,
+        before.freelist_count, after.freelist_count
+    )
+    return {"task": name, "detail": detail, "seconds": elapsed, "reclaimed_bytes": reclaimed,
+            "before": before._asdict(), "after": after._asdict()}
+
+
+def full_vacuum(bind: Engine = default_engine) -> dict:
+    """
+    完整 VACUUM 并转换为 auto_vacuum=INCREMENTAL（之后可增量回收）
+    重写整个数据库文件，执行期间阻塞写入，需要约一倍的临时空间；只在命令行手动执行
+    """
+    started = time.perf_counter()
+    with bind.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        before = space_stats(conn)
+        _pragma(conn, "auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+        # WAL 模式下 VACUUM 的写入先进入 WAL
+        _pragma(conn, "wal_checkpoint(TRUNCATE)")
+        after = space_stats(conn)
+    elapsed = time.perf_counter() - started
+    reclaimed = before.db_bytes + before.wal_bytes - after.db_bytes - after.wal_bytes
+    logger.info(
+        "完整 VACUUM 完成: 耗时 %.1f ms, 释放 %d 字节（数据库 %d → %d）, auto_vacuum %d → %d",
+        elapsed * 1000, reclaimed, before.db_bytes, after.db_bytes, before.auto_vacuum, after.auto_vacuum
+    )
+    return {"task": "full_vacuum", "seconds": elapsed, "reclaimed_bytes": reclaimed,
+            "before": before._asdict(), "after": after._asdict()}
+
+
+@job_handler("db_maintenance", concurrency=1, max_attempts=1)
+def db_maintenance(ctx: JobContext, task: str):
+    run_task(task)
+
+
+def enqueue_maintenance(db, task: str) -> str:
+    """登记一项维护（已有待执行的同项任务时复用），随调用方的事务提交，返回任务 ID"""
+    if task not in TASKS:
+        raise ValueError(f"未知的维护项目: {task}")
+    job_id = enqueue(db, "db_maintenance", unique=True, task=task).id
+    _record_run(db, task, enqueued_at=datetime.utcnow())
+    return job_id
+
+
+def last_runs(db) -> Dict[str, MaintenanceRun]:
+    """各维护项目最近一次登记和成功执行的时间"""
+    return {run.task: run for run in db.query(MaintenanceRun)}
+
+
+def due_tasks(db, now: datetime = None) -> List[str]:
+    now = now or datetime.utcnow()
+    last = {task: run.enqueued_at for task, run in last_runs(db).items() if run.enqueued_at}
+    return [
+        name for name, interval in MAINTENANCE_INTERVALS.items()
+        if interval > 0 and (name not in last or last[name] <= now - timedelta(seconds=interval))
+    ]
+
+
+async def maintain_periodically(check_interval: float = MAINTENANCE_CHECK_SECONDS):
+    """定期登记到期的维护任务，由任务队列执行"""
+    def submit():
+        db = SessionLocal()
+        try:
+            for task in due_tasks(db):
+                enqueue_maintenance(db, task)
+            db.commit()
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(check_interval)
+        try:
+            await run_in_threadpool(submit)
+        except Exception:
+            logger.exception("数据库维护任务登记失败")
@@ -0,0 +1,280 @@
+"""
+运行指标
+- 纯 ASGI 中间件统计每个路由的请求数、耗时分布和进行中的请求数
+- SQLAlchemy 引擎事件统计每个路由的 SQL 执行次数和耗时
+- 连接池、进程内缓存命中率、bcrypt 线程池排队情况在抓取时读取
+/metrics 以 Prometheus 文本格式输出，不依赖 prometheus_client
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 请求耗时分布的桶边界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 未匹配到路由的请求统一记为该值，避免标签基数膨胀
+UNMATCHED_ROUTE = "unmatched"
+
+
+class QueryStats:
+    """单个请求内的 SQL 统计"""
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# 当前请求的 SQL 统计；线程池中执行的代码会复制上下文，共享同一个对象
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+class Histogram:
+    """累积分布"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """指标存储，写入在锁内完成，开销为几次字典操作"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.db_queries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.db_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.in_flight = 0
+        self.started_at = time.time()
+        # 抓取时读取的外部状态: 名称 -> 返回 {标签值: 数值} 或数值的函数
+        self.collectors: Dict[str, Tuple[str, str, Callable[[], object]]] = {}
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float,
+                         queries: Optional[QueryStats]):
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status)] += 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(seconds)
+            if queries is not None and queries.count:
+                self.db_queries[key] += queries.count
+                self.db_seconds[key] += queries.seconds
+
+    def register(self, name: str, kind: str, help_text: str, collect: Callable[[], object]):
+        """注册抓取时读取的指标，collect 返回数值或 {(标签名, 标签值): 数值}"""
+        self.collectors[name] = (kind, help_text, collect)
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            requests = dict(self.requests)
+            latency = {key: (list(h.counts), h.sum, h.count) for key, h in self.latency.items()}
+            db_queries = dict(self.db_queries)
+            db_seconds = dict(self.db_seconds)
+            in_flight = self.in_flight
+
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        header("myledger_http_requests_total", "counter", "HTTP requests by route and status")
+        for (method, route, status), value in sorted(requests.items()):
+            lines.append(
+                f'myledger_http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {value}'
+            )
+
+        header("myledger_http_request_duration_seconds", "histogram", "HTTP request latency by route")
+        for (method, route), (counts, total, count) in sorted(latency.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'myledger_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'myledger_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"myledger_http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"myledger_http_request_duration_seconds_count{{{labels}}} {count}")
+
+        header("myledger_http_requests_in_flight", "gauge", "HTTP requests currently being served")
+        lines.append(f"myledger_http_requests_in_flight {in_flight}")
+
+        header("myledger_db_queries_total", "counter", "SQL statements executed by route")
+        for (method, route), value in sorted(db_queries.items()):
+            lines.append(f'myledger_db_queries_total{{method="{method}",route="{_escape(route)}"}} {value}')
+
+        header("myledger_db_query_seconds_total", "counter", "Time spent executing SQL by route")
+        for (method, route), value in sorted(db_seconds.items()):
+            lines.append(f'myledger_db_query_seconds_total{{method="{method}",route="{_escape(route)}"}} {value:.6f}')
+
+        for name, (kind, help_text, collect) in self.collectors.items():
+            value = collect()
+            header(name, kind, help_text)
+            if isinstance(value, dict):
+                for labels, sample in sorted(value.items()):
+                    label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+                    lines.append(f"{name}{{{label_text}}} {sample}")
+            else:
+                lines.append(f"{name} {value}")
+
+        header("myledger_process_uptime_seconds", "gauge", "Seconds since the metrics registry was created")
+        lines.append(f"myledger_process_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 全局指标
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件（不经过 BaseHTTPMiddleware，不缓冲响应体）
+    路由标签使用路径模板（如 /api/v1/records/{record_id}），由路由匹配后写入 scope
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        metrics.request_started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_query_stats.reset(token)
+            route = scope.get("route")
+            metrics.request_finished(
+                scope["method"],
+                getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE,
+                status_code, elapsed, stats
+            )
+
+
+def instrument_engine(engine: Engine):
+    """在引擎上挂载 SQL 计时事件，计入当前请求的统计"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["metrics_start"].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += time.perf_counter() - start
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # 执行失败时没有 after_cursor_execute，丢弃对应的开始时间
+        if context.connection is not None:
+            starts = context.connection.info.get("metrics_start")
+            if starts:
+                starts.pop()
+
+
+def pool_status(engine: Engine) -> Callable[[], dict]:
+    """连接池状态（QueuePool 提供 size/checkedin/checkedout/overflow）"""
+
+    def collect():
+        values = {}
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(engine.pool, state, None)
+            if method is not None:
+                values[(("state", state),)] = method()
+        return values
+
+    return collect
+
+
+def register_default_collectors(engine: Engine):
+    """注册连接池、缓存、bcrypt 线程池和后台任务的指标"""
+    from .cache import cache_stats
+    from .events import stats_stream
+    from .jobs import count_by_status, job_runner
+    from .routers import auth
+
+    metrics.register(
+        "myledger_db_pool_connections", "gauge", "SQLAlchemy connection pool state", pool_status(engine)
+    )
+    metrics.register(
+        "myledger_cache_hits_total", "counter", "In-process cache hits",
+        lambda: {(("cache", name),): stats.hits for name, stats in cache_stats.items()}
+    )
+    metrics.register(
+        "myledger_cache_misses_total", "counter", "In-process cache misses",
+        lambda: {(("cache", name),): stats.misses for name, stats in cache_stats.items()}
+    )
+    metrics.register(
+        "myledger_cache_hit_ratio", "gauge", "In-process cache hit ratio since start",
+        lambda: {
+            (("cache", name),): round(stats.hits / (stats.hits + stats.misses), 4)
+            for name, stats in cache_stats.items() if stats.hits + stats.misses
+        }
+    )
+    metrics.register(
+        "myledger_bcrypt_pending", "gauge", "bcrypt tasks submitted and not yet finished",
+        lambda: auth.bcrypt_pending
+    )
+    metrics.register(
+        "myledger_bcrypt_queue_depth", "gauge", "bcrypt tasks waiting for a free worker",
+        lambda: max(0, auth.bcrypt_pending - auth.BCRYPT_WORKERS)
+    )
+    metrics.register(
+        "myledger_jobs", "gauge", "Background jobs by status (all workers)",
+        lambda: {(("status", name),): count for name, count in count_by_status(engine).items()}
+    )
+    metrics.register(
+        "myledger_jobs_running_local", "gauge", "Background jobs executing in this process",
+        lambda: job_runner.running
+    )
+    metrics.register(
+        "myledger_sse_subscribers", "gauge", "Open statistics stream connections in this process",
+        lambda: stats_stream.subscriber_count
+    )
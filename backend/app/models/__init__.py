@@ -3,7 +3,7 @@
 所有数据库模型的定义
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -39,7 +39,10 @@ class Category(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关系
-    items = relationship("CategoryItem", back_populates="category", cascade="all, delete")
+    items = relationship(
+        "CategoryItem", back_populates="category", cascade="all, delete",
+        order_by="CategoryItem.sort_order"
+    )
 
 
 class CategoryItem(Base):
@@ -57,6 +60,11 @@ class CategoryItem(Base):
     # 关系
     category = relationship("Category", back_populates="items")
 
+    __table_args__ = (
+        # 同一分类下名称唯一（init_categories.py 的 upsert 冲突键）
+        Index("uq_category_items_category_name", "category_id", "name", unique=True),
+    )
+
 
 class PaymentMethod(Base):
     """支付方式表"""
@@ -91,6 +99,17 @@ class Record(Base):
     user = relationship("User", back_populates="records")
     project = relationship("Project", back_populates="records")
 
+    __table_args__ = (
+        # 用户记录列表/统计/删除用户
+        Index("ix_records_user_date", "user_id", "date"),
+        # 项目详情: 分组汇总与 (date, id) 键集分页
+        Index("ix_records_project_date", "project_id", "date", "id"),
+        # 管理端记录浏览: 按 (created_at, id) 键集分页，可叠加用户/分类筛选
+        Index("ix_records_created", "created_at", "id"),
+        Index("ix_records_user_created", "user_id", "created_at", "id"),
+        Index("ix_records_category_created", "category_id", "created_at", "id"),
+    )
+
 
 class Project(Base):
     """项目表"""
@@ -112,3 +131,95 @@ class Project(Base):
     # 关系
     user = relationship("User", back_populates="projects")
     records = relationship("Record", back_populates="project")
+
+
+class Counter(Base):
+    """全局计数器表（由 app/counters.py 安装的触发器维护）"""
+    __tablename__ = "counters"
+
+    name = Column(String(50), primary_key=True)  # users / records / projects / categories
+    value = Column(Integer, nullable=False, default=0)
+
+
+class UserCounter(Base):
+    """用户计数器表（由触发器维护）"""
+    __tablename__ = "user_counters"
+
+    user_id = Column(Integer, primary_key=True)
+    record_count = Column(Integer, nullable=False, default=0)
+    project_count = Column(Integer, nullable=False, default=0)
+    text_bytes = Column(Integer, nullable=False, default=0, server_default="0")  # 记录备注占用的字节数
+    last_activity_at = Column(DateTime, default=None)  # 最近一次写入记录/项目或登录的时间
+
+
+class UserDailyActivity(Base):
+    """
+    用户每日活动汇总（由触发器和登录维护，删除记录不回减）
+    当日新增记录或登录即有一行，行数即当日活跃用户数
+    """
+    __tablename__ = "user_daily_activity"
+
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    records_created = Column(Integer, nullable=False, default=0)
+
+
+class DailyActivity(Base):
+    """平台每日活动汇总（由触发器和登录维护，只增不减）"""
+    __tablename__ = "daily_activity"
+
+    day = Column(Date, primary_key=True)
+    active_users = Column(Integer, nullable=False, default=0, server_default="0")
+    logins = Column(Integer, nullable=False, default=0, server_default="0")
+    registrations = Column(Integer, nullable=False, default=0, server_default="0")
+    records_created = Column(Integer, nullable=False, default=0, server_default="0")
+    records_updated = Column(Integer, nullable=False, default=0, server_default="0")
+    records_deleted = Column(Integer, nullable=False, default=0, server_default="0")
+    write_bytes = Column(Integer, nullable=False, default=0, server_default="0")  # 估算写入量
+
+
+class DataVersion(Base):
+    """数据版本号（由触发器维护，多个 worker 进程共享，用于进程内缓存失效）"""
+    __tablename__ = "data_versions"
+
+    scope = Column(String(50), primary_key=True)  # reference / user:{id} / project:{id} / *
+    version = Column(Integer, nullable=False, default=0)
+    seq = Column(Integer, nullable=False, default=0, index=True)  # 最后一次递增时的全局序号
+    updated_at = Column(DateTime)  # 最后一次递增的时间（UTC，秒级）
+
+
+class MaintenanceRun(Base):
+    """数据库维护各项目最近一次登记和成功执行的时间（不随已结束任务的清理删除）"""
+    __tablename__ = "maintenance_runs"
+
+    task = Column(String(50), primary_key=True)  # optimize / vacuum / checkpoint / integrity_check
+    enqueued_at = Column(DateTime, default=None)  # 最近一次登记为后台任务，据此判断是否到期
+    succeeded_at = Column(DateTime, default=None)  # 最近一次成功完成（后台任务或命令行）
+
+
+class Job(Base):
+    """后台任务（持久化队列，多个 worker 进程共享）"""
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid hex
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String(20), nullable=False, default="pending")  # pending / running / succeeded / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    error = Column(Text, default=None)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)  # 重试退避
+    locked_by = Column(String(64), default=None)  # 执行中的 worker
+    locked_until = Column(DateTime, default=None)  # 租约到期后视为 worker 已退出，可被重新领取
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, default=None)
+    finished_at = Column(DateTime, default=None)
+
+    __table_args__ = (
+        # 领取任务: 按 (status, run_after) 查找可执行任务
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        # 管理端任务列表
+        Index("ix_jobs_created", "created_at"),
+    )
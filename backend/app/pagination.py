@@ -0,0 +1,34 @@
+"""
+键集分页
+游标为最后一条记录的 (排序时间, id)，base64 编码后返回给客户端
+"""
+
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(value: datetime, record_id: int) -> str:
+    raw = f"{value.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        value, record_id = raw.split('|')
+        return datetime.fromisoformat(value), int(record_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="游标无效"
+        )
+
+
+def before_cursor(column, id_column, cursor: str):
+    """(column, id) 倒序排列时，位于游标之后的行的过滤条件"""
+    value, record_id = decode_cursor(cursor)
+    return or_(column < value, and_(column == value, id_column < record_id))
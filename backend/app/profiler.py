@@ -0,0 +1,179 @@
+"""
+SQL 性能分析（按需开启，SQL_PROFILE=1）
+- 中间件为每个请求记录执行的全部 SQL（before/after_cursor_execute 事件）
+- 响应头返回语句数、总耗时和重复语句数，重复次数达到阈值时记录警告日志（疑似 N+1）
+- 超出查询预算（SQL_QUERY_BUDGET）时记录警告，严格模式下直接抛出 QueryBudgetExceeded
+- assert_max_queries() 用于脚本和测试中限定一段代码的语句数
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 是否启用请求级 SQL 分析
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0") == "1"
+# 单个请求允许的语句数，0 表示不限制
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "0"))
+# 超出预算时抛出异常（用于测试环境），否则只记录警告
+SQL_PROFILE_STRICT = os.getenv("SQL_PROFILE_STRICT", "0") == "1"
+# 同一语句形态在一个请求内重复达到该次数时视为疑似 N+1
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((?:\?|__\[POSTCOMPILE_\w+\])(?:, ?\?)*\)", re.IGNORECASE)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class QueryBudgetExceeded(Exception):
+    """语句数超出预算"""
+
+
+def statement_shape(statement: str) -> str:
+    """语句形态: 去除字面量、折叠空白和 IN 列表，使仅参数不同的语句归为一类"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _LITERAL.sub("?", shape)
+    return _IN_LIST.sub("IN (...)", shape)
+
+
+class QueryProfile:
+    """一段代码内执行的语句及耗时"""
+
+    def __init__(self, budget: int = 0, strict: bool = False):
+        self.budget = budget
+        self.strict = strict
+        self.statements: List[Tuple[str, float]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(seconds for _, seconds in self.statements)
+
+    def add(self, statement: str, seconds: float):
+        self.statements.append((statement, seconds))
+        if self.strict and self.budget and self.count > self.budget:
+            raise QueryBudgetExceeded(f"执行了 {self.count} 条语句，超出预算 {self.budget}")
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """重复次数达到阈值的语句形态，按次数倒序"""
+        shapes = Counter(statement_shape(statement) for statement, _ in self.statements)
+        return [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+    def summary(self) -> str:
+        lines = [f"{self.count} 条语句, {self.seconds * 1000:.1f} ms"]
+        for shape, n in self.repeated():
+            lines.append(f"  x{n} {shape}")
+        return "\n".join(lines)
+
+
+# 当前请求的分析记录
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+
+def install_profiler(engine: Engine):
+    """在引擎上挂载 SQL 记录事件，记入当前请求的 QueryProfile"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["profiler_start"].pop()
+        profile = current_profile.get()
+        if profile is not None:
+            profile.add(statement, time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("profiler_start")
+            if starts:
+                starts.pop()
+
+
+class SQLProfilerMiddleware:
+    """
+    纯 ASGI 中间件
+    响应头: X-SQL-Queries / X-SQL-Time-Ms / X-SQL-Repeated（疑似 N+1 的语句形态数）
+    响应开始后执行的语句（如后台任务）只计入日志
+    """
+
+    def __init__(self, app, budget: int = SQL_QUERY_BUDGET, strict: bool = SQL_PROFILE_STRICT):
+        self.app = app
+        self.budget = budget
+        self.strict = strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(self.budget, self.strict)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-sql-queries", str(profile.count).encode()))
+                headers.append((b"x-sql-time-ms", f"{profile.seconds * 1000:.2f}".encode()))
+                headers.append((b"x-sql-repeated", str(len(profile.repeated())).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            path = f"{scope['method']} {scope['path']}"
+            if profile.repeated():
+                logger.warning("疑似 N+1 查询 %s: %s", path, profile.summary())
+            elif self.budget and profile.count > self.budget:
+                logger.warning("查询数超出预算 %s (%d): %s", path, self.budget, profile.summary())
+            else:
+                logger.debug("SQL %s: %s", path, profile.summary())
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine: Optional[Engine] = None) -> Iterator[QueryProfile]:
+    """
+    限定代码块内执行的语句数，超出时抛出 QueryBudgetExceeded
+    统计引擎上的所有语句（不依赖请求上下文，TestClient 在其他线程中执行请求也能统计）
+
+        with assert_max_queries(3):
+            client.get("/api/v1/records", headers=headers)
+    """
+    if engine is None:
+        from .database import engine
+
+    profile = QueryProfile()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("assert_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["assert_start"].pop()
+        profile.add(statement, time.perf_counter() - start)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield profile
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+
+    if profile.count > limit:
+        raise QueryBudgetExceeded(f"执行了 {profile.count} 条语句，超出上限 {limit}\n{profile.summary()}")
@@ -0,0 +1,101 @@
+"""
+响应渲染
+- 基于 orjson 的 JSON 响应类，原生处理 datetime/date，
+  Decimal 输出为字符串（与 Pydantic 的 JSON 序列化保持一致）
+- 预先序列化的响应体及条件请求（ETag / Last-Modified → 304）
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from decimal import Decimal
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, NamedTuple, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+
+def _default(obj: Any) -> Any:
+    """orjson 无法原生序列化的类型"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为 JSON 字节串"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    全局默认响应类
+    热点列表接口直接返回该响应（内容为 dict/list），
+    跳过 response_model 的重复校验和 jsonable_encoder
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class CachedBody(NamedTuple):
+    """预先序列化的 JSON 响应体及其校验值"""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def cached_body(body: bytes, last_modified: Optional[datetime] = None) -> CachedBody:
+    """
+    ETag 取内容摘要（各 worker 一致，数据库重建后也不会与旧内容混淆）；
+    使用弱 ETag，压缩后的响应仍可用同一个值校验。
+    last_modified 由调用方传入数据最后一次变化的时间（数据库中记录，各 worker 一致），
+    只有秒级精度，同一秒内的多次变化只能靠 ETag 区分
+    """
+    etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+    if last_modified is not None:
+        last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    return CachedBody(body, etag, last_modified)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 弱比较"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def conditional_response(request: Request, cached: CachedBody, cache_control: str) -> Response:
+    """按请求的 If-None-Match（优先）或 If-Modified-Since 返回 304 或完整响应"""
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": cache_control,
+        # 304 不经过压缩中间件，需要自行声明与完整响应相同的 Vary
+        "Vary": "Accept-Encoding",
+    }
+    if cached.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(cached.last_modified, usegmt=True)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, cached.etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = (
+            if_modified_since is not None and cached.last_modified is not None
+            and _not_modified_since(if_modified_since, cached.last_modified)
+        )
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
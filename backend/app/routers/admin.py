@@ -3,18 +3,36 @@
 管理员功能 API
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 
 from ..database import get_db
-from ..models import User, Record, Category, CategoryItem, PaymentMethod, Project
-from ..schemas.user import UserResponse, UserUpdate
-from ..schemas.record import RecordResponse, RecordListResponse
-from ..schemas.category import CategoryResponse, CategoryItemResponse, PaymentMethodResponse
+from ..models import (
+    User, Record, Category, CategoryItem, PaymentMethod, Project, UserCounter, UserDailyActivity, DailyActivity, Job
+)
+from ..schemas.user import UserResponse, UserUpdate, UserUsageListResponse
+from ..schemas.record import RecordResponse, AdminRecordListResponse
+from ..schemas.category import (
+    CategoryResponse, CategoryItemResponse, PaymentMethodResponse,
+    ReorderRequest, CategoryBulkRequest, CategoryItemBulkRequest,
+    PaymentMethodBulkRequest, BulkResultResponse
+)
 from ..schemas.project import ProjectResponse
+from ..schemas.job import JobResponse, JobListResponse
+from ..cache import reference_cache
+from ..responses import FastJSONResponse
+from .. import cascade, counters, maintenance
+from .projects import enqueue_total_recompute
+from .. import jobs
 from .auth import get_current_user, get_current_admin
+from .records import record_detail, parse_date
+from ..pagination import encode_cursor, before_cursor
 
 router = APIRouter(prefix="/api/v1/admin", tags=["管理"])
 
@@ -38,8 +56,95 @@ async def get_user_count(
     current_admin: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """获取用户总数"""
-    return {"count": db.query(User).count()}
+    """获取用户总数（读取计数器）"""
+    return {"count": counters.get_counters(db).get("users", 0)}
+
+
+# 用量报表统计的天数
+USAGE_DAYS = 30
+
+
+@router.get("/users/usage", response_model=UserUsageListResponse, summary="用户用量")
+async def get_user_usage(
+    sort: str = Query("records", pattern="^(records|projects|size|recent|last_activity|username)$",
+                      description="排序字段"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="排序方向"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    每个用户的记录数、项目数、估算数据量、近 30 天每日新增记录数和最近活动时间
+    全部来自触发器维护的 user_counters / user_daily_activity，不扫描 records
+    """
+    since = datetime.utcnow().date() - timedelta(days=USAGE_DAYS - 1)
+    recent = db.query(
+        UserDailyActivity.user_id,
+        func.sum(UserDailyActivity.records_created).label("recent")
+    ).filter(UserDailyActivity.day >= since).group_by(UserDailyActivity.user_id).subquery()
+
+    record_count = func.coalesce(UserCounter.record_count, 0)
+    project_count = func.coalesce(UserCounter.project_count, 0)
+    data_size = (
+        record_count * counters.RECORD_ROW_BYTES
+        + project_count * counters.PROJECT_ROW_BYTES
+        + func.coalesce(UserCounter.text_bytes, 0)
+    )
+    recent_records = func.coalesce(recent.c.recent, 0)
+    sort_column = {
+        "records": record_count,
+        "projects": project_count,
+        "size": data_size,
+        "recent": recent_records,
+        "last_activity": UserCounter.last_activity_at,
+        "username": User.username,
+    }[sort]
+    direction = sort_column.desc() if order == "desc" else sort_column.asc()
+    tiebreak = User.id.desc() if order == "desc" else User.id.asc()
+
+    rows = db.query(
+        User.id, User.username, User.is_active,
+        record_count.label("record_count"),
+        project_count.label("project_count"),
+        data_size.label("data_size"),
+        recent_records.label("recent_records"),
+        UserCounter.last_activity_at
+    ).outerjoin(UserCounter, UserCounter.user_id == User.id).outerjoin(
+        recent, recent.c.user_id == User.id
+    ).order_by(direction, tiebreak).offset((page - 1) * page_size).limit(page_size).all()
+
+    # 当前页用户的每日明细
+    daily = {}
+    if rows:
+        for user_id, day, count in db.query(
+            UserDailyActivity.user_id, UserDailyActivity.day, UserDailyActivity.records_created
+        ).filter(
+            UserDailyActivity.user_id.in_([r.id for r in rows]),
+            UserDailyActivity.day >= since,
+            UserDailyActivity.records_created > 0
+        ).order_by(UserDailyActivity.user_id, UserDailyActivity.day):
+            daily.setdefault(user_id, []).append({"date": day, "count": count})
+
+    return FastJSONResponse({
+        "users": [
+            {
+                "user_id": r.id,
+                "username": r.username,
+                "is_active": r.is_active,
+                "record_count": r.record_count,
+                "project_count": r.project_count,
+                "data_size": r.data_size,
+                "recent_records": r.recent_records,
+                "daily_records": daily.get(r.id, []),
+                "last_activity_at": r.last_activity_at
+            }
+            for r in rows
+        ],
+        "total": counters.get_counters(db).get("users", 0),
+        "page": page,
+        "page_size": page_size
+    })
 
 
 @router.put("/users/{user_id}", response_model=UserResponse, summary="更新用户")
@@ -69,40 +174,210 @@ async def delete_user(
     current_admin: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """删除用户"""
+    """
+    删除用户及其全部记录和项目
+    - 记录数较少时在一个事务中完成
+    - 记录数超过阈值时禁用账户并登记后台分批删除任务，返回 202 和任务 ID，
+      通过 /admin/jobs/{job_id} 查询进度
+    """
     if user_id == current_admin.id:
         raise HTTPException(status_code=400, detail="不能删除自己")
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    user_exists = db.query(User.id).filter(User.id == user_id).first()
+    if not user_exists:
         raise HTTPException(status_code=404, detail="用户不存在")
     
-    db.delete(user)
+    record_count = cascade.count_user_records(db, user_id)
+    if record_count > cascade.BACKGROUND_THRESHOLD:
+        db.execute(update(User).where(User.id == user_id).values(is_active=False))
+        job = jobs.enqueue(db, "delete_user", total=record_count, unique=True, user_id=user_id)
+        db.commit()
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"message": "删除任务已提交", "job_id": job.id}
+        )
+    
+    cascade.delete_user(db, user_id)
     db.commit()
     return {"message": "删除成功"}
 
 
+# ============ 后台任务 ============
+
+@router.get("/jobs", response_model=JobListResponse, summary="后台任务列表")
+async def get_jobs(
+    job_status: Optional[str] = Query(None, alias="status", description="状态: pending/running/succeeded/failed"),
+    kind: Optional[str] = Query(None, description="任务类型"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """按创建时间倒序列出后台任务"""
+    query = db.query(Job)
+    if job_status:
+        query = query.filter(Job.status == job_status)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    total = query.count()
+    items = query.order_by(Job.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    return {"jobs": items, "total": total, "page": page, "page_size": page_size}
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse, summary="后台任务进度")
+async def get_job_status(
+    job_id: str,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """查询后台任务状态和进度"""
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@router.post("/jobs/{job_id}/retry", response_model=JobResponse, summary="重试失败的任务")
+async def retry_job(
+    job_id: str,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """把失败的任务重新置为待执行，重新计算重试次数"""
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job.status != "failed":
+        raise HTTPException(status_code=400, detail="只能重试失败的任务")
+    jobs.retry(db, job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@router.post("/counters/reconcile", status_code=status.HTTP_202_ACCEPTED, summary="校准计数器")
+async def reconcile_counters(
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """登记一次计数器和用户用量的全量校准任务（已有待执行的校准任务时复用）"""
+    job_id = counters.enqueue_reconcile(db)
+    db.commit()
+    return {"message": "校准任务已提交", "job_id": job_id}
+
+
+@router.post("/maintenance/{task}", status_code=status.HTTP_202_ACCEPTED, summary="数据库维护")
+async def run_maintenance(
+    task: str,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    立即登记一项数据库维护任务（已有待执行的同项任务时复用）
+    - task: optimize / vacuum / checkpoint / integrity_check
+    """
+    if task not in maintenance.TASKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"未知的维护项目，可选: {', '.join(maintenance.TASKS)}"
+        )
+    job_id = maintenance.enqueue_maintenance(db, task)
+    db.commit()
+    return {"message": "维护任务已提交", "job_id": job_id}
+
+
 # ============ 记录管理 ============
 
-@router.get("/records", response_model=RecordListResponse, summary="记录列表")
+# 筛选条件下估算总数时最多计数的行数
+APPROX_TOTAL_CAP = 10000
+
+
+@router.get("/records", response_model=AdminRecordListResponse, summary="记录列表")
 async def get_all_records(
-    page: int = 1,
-    page_size: int = 20,
+    user_id: Optional[int] = Query(None, description="用户ID"),
+    record_type: Optional[str] = Query(None, alias="type", description="类型: income/expense"),
+    category_id: Optional[int] = Query(None, description="一级分类ID"),
+    min_amount: Optional[Decimal] = Query(None, ge=0, description="最小金额"),
+    max_amount: Optional[Decimal] = Query(None, ge=0, description="最大金额"),
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    page: int = Query(1, ge=1, description="页码（未传 cursor 时使用）"),
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    total_mode: str = Query("approx", alias="total", pattern="^(none|approx|exact)$",
+                            description="总数: none 不计算 / approx 计数器或截断计数 / exact 精确计数"),
     current_admin: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """获取所有用户的记录"""
-    query = db.query(Record).order_by(Record.created_at.desc())
-    total = query.count()
-    records = query.offset((page-1)*page_size).limit(page_size).all()
+    """
+    获取所有用户的记录
+    - 按用户、类型、分类、金额范围、日期范围筛选
+    - 按 (created_at, id) 倒序键集分页，附带用户名、项目标题和分类名称
+    """
+    query = db.query(Record, User.username, Project.title).join(
+        User, User.id == Record.user_id
+    ).outerjoin(Project, Project.id == Record.project_id)
     
-    return {
+    filters = []
+    if user_id:
+        filters.append(Record.user_id == user_id)
+    if record_type:
+        filters.append(Record.type == record_type)
+    if category_id:
+        filters.append(Record.category_id == category_id)
+    if min_amount is not None:
+        filters.append(Record.amount >= min_amount)
+    if max_amount is not None:
+        filters.append(Record.amount <= max_amount)
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if start:
+        filters.append(Record.date >= start)
+    if end:
+        filters.append(Record.date < end + timedelta(days=1))
+    
+    # 总数
+    total = None
+    total_is_estimate = False
+    if total_mode == "exact":
+        total = db.query(func.count(Record.id)).filter(*filters).scalar()
+    elif total_mode == "approx":
+        if not filters:
+            total = counters.get_counters(db).get("records", 0)
+        elif len(filters) == 1 and user_id:
+            total = counters.get_user_counter(db, user_id).record_count
+        else:
+            capped = db.query(Record.id).filter(*filters).limit(APPROX_TOTAL_CAP).subquery()
+            total = db.query(func.count()).select_from(capped).scalar()
+            total_is_estimate = total >= APPROX_TOTAL_CAP
+    
+    query = query.filter(*filters)
+    if cursor:
+        query = query.filter(before_cursor(Record.created_at, Record.id, cursor))
+    elif page > 1:
+        query = query.offset((page - 1) * page_size)
+    
+    rows = query.order_by(Record.created_at.desc(), Record.id.desc()).limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    
+    records = []
+    for record, username, project_title in rows[:page_size]:
+        item = record_detail(record, project_title)
+        item["username"] = username
+        records.append(item)
+    
+    return FastJSONResponse({
         "records": records,
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "page": page,
         "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
-    }
+        "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+        "next_cursor": next_cursor
+    })
 
 
 @router.delete("/records/{record_id}", summary="删除记录")
@@ -117,10 +392,164 @@ async def delete_record(
         raise HTTPException(status_code=404, detail="记录不存在")
     
     db.delete(record)
+    # 关联了项目时在后台重算项目总消费
+    enqueue_total_recompute(db, record.project_id)
     db.commit()
     return {"message": "删除成功"}
 
 
+# ============ 批量操作 ============
+
+def check_ids_exist(db: Session, model, ids: List[int], detail: str):
+    """一次查询校验 ID 全部存在"""
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="ID 重复")
+    found = set(db.execute(select(model.id).where(model.id.in_(ids))).scalars())
+    missing = [i for i in ids if i not in found]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"{detail}: {missing}")
+
+
+def apply_reorder(db: Session, model, ids: List[int], detail: str, parent=None) -> BulkResultResponse:
+    """
+    按列表顺序重写 sort_order，一条 executemany 完成
+    ids 必须恰好是全部同级项（否则未列出的项会与新的排序值重复）；
+    parent: 按外键分组的同级项（二级分类为所属一级分类），ids 须属于同一组
+    """
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="ID 重复")
+    siblings = select(model.id)
+    if parent is not None:
+        parents = set(db.execute(select(parent).where(model.id.in_(ids))).scalars())
+        if len(parents) > 1:
+            raise HTTPException(status_code=400, detail="只能对同一组内的项目排序")
+        if parents:
+            siblings = siblings.where(parent == parents.pop())
+    found = set(db.execute(siblings).scalars())
+    missing = [i for i in ids if i not in found]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"{detail}: {missing}")
+    omitted = found.difference(ids)
+    if omitted:
+        raise HTTPException(status_code=400, detail=f"排序须包含全部同级项，缺少: {sorted(omitted)}")
+    db.execute(
+        update(model),
+        [{"id": pk, "sort_order": index} for index, pk in enumerate(ids, start=1)]
+    )
+    db.commit()
+    reference_cache.invalidate()
+    return BulkResultResponse(updated=len(ids))
+
+
+def apply_bulk(db: Session, model, ops, detail: str, children=None) -> BulkResultResponse:
+    """
+    在一个事务中执行批量创建/更新/删除
+    - 创建和更新各为一条 executemany
+    - children: (子表模型, 外键列)，删除时一并删除子表行
+    """
+    update_ids = [op.id for op in ops.update]
+    if update_ids:
+        check_ids_exist(db, model, update_ids, detail)
+    if ops.delete:
+        check_ids_exist(db, model, ops.delete, detail)
+    
+    try:
+        if ops.create:
+            db.execute(insert(model), [op.model_dump() for op in ops.create])
+        
+        # executemany 要求每行的列一致，按更新字段分组
+        groups = {}
+        for op in ops.update:
+            values = op.model_dump(exclude_unset=True)
+            groups.setdefault(tuple(sorted(values)), []).append(values)
+        for rows in groups.values():
+            db.execute(update(model), rows)
+        
+        if ops.delete:
+            if children is not None:
+                child_model, foreign_key = children
+                db.execute(delete(child_model).where(foreign_key.in_(ops.delete)))
+            db.execute(delete(model).where(model.id.in_(ops.delete)))
+        
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="名称重复或关联数据不存在")
+    
+    reference_cache.invalidate()
+    return BulkResultResponse(
+        created=len(ops.create),
+        updated=len(ops.update),
+        deleted=len(ops.delete)
+    )
+
+
+@router.put("/categories/reorder", response_model=BulkResultResponse, summary="分类批量排序")
+async def reorder_categories(
+    request: ReorderRequest,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """按 ids 顺序重写分类排序（ids 为全部分类）"""
+    return apply_reorder(db, Category, request.ids, "分类不存在")
+
+
+@router.post("/categories/bulk", response_model=BulkResultResponse, summary="分类批量操作")
+async def bulk_categories(
+    request: CategoryBulkRequest,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """批量创建/更新/删除分类（删除时级联删除二级分类）"""
+    return apply_bulk(
+        db, Category, request, "分类不存在",
+        children=(CategoryItem, CategoryItem.category_id)
+    )
+
+
+@router.put("/category-items/reorder", response_model=BulkResultResponse, summary="二级分类批量排序")
+async def reorder_category_items(
+    request: ReorderRequest,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """按 ids 顺序重写二级分类排序（ids 为同一一级分类下的全部二级分类）"""
+    return apply_reorder(db, CategoryItem, request.ids, "二级分类不存在", parent=CategoryItem.category_id)
+
+
+@router.post("/category-items/bulk", response_model=BulkResultResponse, summary="二级分类批量操作")
+async def bulk_category_items(
+    request: CategoryItemBulkRequest,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """批量创建/更新/删除二级分类"""
+    category_ids = {op.category_id for op in request.create}
+    if category_ids:
+        check_ids_exist(db, Category, list(category_ids), "一级分类不存在")
+    return apply_bulk(db, CategoryItem, request, "二级分类不存在")
+
+
+@router.put("/payment-methods/reorder", response_model=BulkResultResponse, summary="支付方式批量排序")
+async def reorder_payment_methods(
+    request: ReorderRequest,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """按 ids 顺序重写支付方式排序（ids 为全部支付方式）"""
+    return apply_reorder(db, PaymentMethod, request.ids, "支付方式不存在")
+
+
+@router.post("/payment-methods/bulk", response_model=BulkResultResponse, summary="支付方式批量操作")
+async def bulk_payment_methods(
+    request: PaymentMethodBulkRequest,
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """批量创建/更新/删除支付方式"""
+    return apply_bulk(db, PaymentMethod, request, "支付方式不存在")
+
+
 # ============ 分类管理 ============
 
 @router.get("/categories", response_model=List[CategoryResponse], summary="分类列表")
@@ -151,6 +580,7 @@ async def create_category(
     category = Category(name=name, type=type, icon=icon)
     db.add(category)
     db.commit()
+    reference_cache.invalidate()
     db.refresh(category)
     return category
 
@@ -174,6 +604,7 @@ async def update_category(
         category.icon = icon
     
     db.commit()
+    reference_cache.invalidate()
     db.refresh(category)
     return category
 
@@ -191,6 +622,7 @@ async def delete_category(
     
     db.delete(category)
     db.commit()
+    reference_cache.invalidate()
     return {"message": "删除成功"}
 
 
@@ -219,10 +651,13 @@ async def create_category_item(
     """创建二级分类"""
     if not db.query(Category).filter(Category.id == category_id).first():
         raise HTTPException(status_code=400, detail="一级分类不存在")
+    if db.query(CategoryItem).filter(CategoryItem.category_id == category_id, CategoryItem.name == name).first():
+        raise HTTPException(status_code=400, detail="二级分类已存在")
     
     item = CategoryItem(category_id=category_id, name=name)
     db.add(item)
     db.commit()
+    reference_cache.invalidate()
     db.refresh(item)
     return item
 
@@ -240,6 +675,7 @@ async def delete_category_item(
     
     db.delete(item)
     db.commit()
+    reference_cache.invalidate()
     return {"message": "删除成功"}
 
 
@@ -268,6 +704,7 @@ async def create_payment_method(
     pm = PaymentMethod(name=name, icon=icon)
     db.add(pm)
     db.commit()
+    reference_cache.invalidate()
     db.refresh(pm)
     return pm
 
@@ -285,6 +722,7 @@ async def delete_payment_method(
     
     db.delete(pm)
     db.commit()
+    reference_cache.invalidate()
     return {"message": "删除成功"}
 
 
@@ -308,15 +746,15 @@ async def get_all_projects(
 @router.delete("/projects/{project_id}", summary="删除项目")
 async def delete_project(
     project_id: int,
+    mode: str = Query("detach", pattern="^(detach|purge)$", description="detach: 保留记录并解除关联; purge: 删除关联记录"),
     current_admin: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """删除项目"""
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    """删除项目（关联记录按 mode 解除关联或一并删除）"""
+    if not db.query(Project.id).filter(Project.id == project_id).first():
         raise HTTPException(status_code=404, detail="项目不存在")
     
-    db.delete(project)
+    cascade.delete_project(db, project_id, purge=(mode == "purge"))
     db.commit()
     return {"message": "删除成功"}
 
@@ -328,10 +766,73 @@ async def get_admin_stats(
     current_admin: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """获取管理统计数据"""
+    """获取管理统计数据（读取计数器，O(1)）"""
+    values = counters.get_counters(db)
     return {
-        "user_count": db.query(User).count(),
-        "record_count": db.query(Record).count(),
-        "project_count": db.query(Project).count(),
-        "category_count": db.query(Category).count()
+        "user_count": values.get("users", 0),
+        "record_count": values.get("records", 0),
+        "project_count": values.get("projects", 0),
+        "category_count": values.get("categories", 0)
+    }
+
+
+# 活动分析允许的最大日期跨度（天）
+ANALYTICS_MAX_DAYS = 3660
+ACTIVITY_FIELDS = (
+    "active_users", "logins", "registrations",
+    "records_created", "records_updated", "records_deleted", "write_bytes"
+)
+
+
+@router.get("/analytics", summary="平台活动分析")
+async def get_activity_analytics(
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD，默认近 30 天"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD，默认今天"),
+    current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    按天返回活跃用户数、登录、注册、记录新增/修改/删除数和估算写入量
+    读取触发器维护的 daily_activity 汇总表，不扫描 records；无活动的日期补 0
+    """
+    end = (parse_date(end_date) or datetime.utcnow()).date()
+    start = parse_date(start_date)
+    start = start.date() if start else end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    days = (end - start).days + 1
+    if days > ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail="日期范围过大")
+
+    rows = {
+        row.day: row
+        for row in db.query(DailyActivity).filter(DailyActivity.day >= start, DailyActivity.day <= end)
     }
+    series = []
+    totals = dict.fromkeys(ACTIVITY_FIELDS, 0)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        point = {"date": day}
+        for field in ACTIVITY_FIELDS:
+            value = getattr(row, field) if row else 0
+            point[field] = value
+            totals[field] += value
+        series.append(point)
+
+    active = [point["active_users"] for point in series]
+    return FastJSONResponse({
+        "start_date": start,
+        "end_date": end,
+        "series": series,
+        "totals": {
+            "logins": totals["logins"],
+            "registrations": totals["registrations"],
+            "records_created": totals["records_created"],
+            "records_updated": totals["records_updated"],
+            "records_deleted": totals["records_deleted"],
+            "write_bytes": totals["write_bytes"],
+            "avg_daily_active_users": round(sum(active) / days, 2),
+            "peak_daily_active_users": max(active)
+        }
+    })
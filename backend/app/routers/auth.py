@@ -3,15 +3,20 @@
 用户注册、登录、JWT Token 管理
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Form, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Form, Header, BackgroundTasks
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 import bcrypt
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..models import User
+from .. import counters
 from ..schemas.user import (
     UserCreate, UserLogin, UserResponse, Token, 
     RegisterResponse, LoginResponse, MessageResponse
@@ -22,12 +27,99 @@ import os
 SECRET_KEY = os.getenv("SECRET_KEY", "myleger-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 10080  # 7天
+# 统计推送令牌: 只能用于建立 /statistics/stream 连接，有效期很短（会出现在访问日志的 URL 中）
+STREAM_TOKEN_SCOPE = "stats_stream"
+STREAM_TOKEN_EXPIRE_SECONDS = 60
 INVITE_CODE = "vip1123"
 
+# bcrypt 代价因子（4-31），每 +1 耗时翻倍；修改后旧哈希会在登录成功时自动升级
+BCRYPT_ROUNDS = min(max(int(os.getenv("BCRYPT_ROUNDS", "12")), 4), 31)
+# bcrypt 专用线程池大小，避免哈希计算阻塞事件循环
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+
+logger = logging.getLogger(__name__)
+
+# bcrypt 线程池
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+# 已提交到线程池、尚未完成的哈希任务数（只在事件循环线程中修改）
+bcrypt_pending = 0
+
 # 路由
 router = APIRouter(prefix="/api/v1/auth", tags=["认证"])
 
 
+# ============ 密码哈希 ============
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """使用 bcrypt 加密密码"""
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """校验密码"""
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def get_hash_rounds(password_hash: str) -> Optional[int]:
+    """从哈希中解析代价因子，格式: $2b$12$<salt+hash>"""
+    parts = password_hash.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """哈希的代价因子与当前配置不一致时需要重新加密"""
+    return get_hash_rounds(password_hash) != BCRYPT_ROUNDS
+
+
+async def run_bcrypt(func, *args):
+    """在 bcrypt 线程池中执行哈希计算"""
+    global bcrypt_pending
+    loop = asyncio.get_running_loop()
+    bcrypt_pending += 1
+    try:
+        return await loop.run_in_executor(bcrypt_executor, func, *args)
+    finally:
+        bcrypt_pending -= 1
+
+
+async def rehash_password(user_id: int, password: str, old_hash: str):
+    """
+    后台任务：用当前代价因子重新加密密码
+    仅当哈希未被其他请求修改时才写回
+    """
+    new_hash = await run_bcrypt(hash_password, password)
+    db = SessionLocal()
+    try:
+        updated = db.query(User).filter(
+            User.id == user_id,
+            User.password_hash == old_hash
+        ).update({User.password_hash: new_hash}, synchronize_session=False)
+        db.commit()
+        if updated:
+            logger.info(
+                "用户 %s 密码哈希已升级: cost %s -> %s",
+                user_id, get_hash_rounds(old_hash), BCRYPT_ROUNDS
+            )
+    except Exception:
+        db.rollback()
+        logger.exception("用户 %s 密码哈希升级失败", user_id)
+    finally:
+        db.close()
+
+
+def measure_hash_time(rounds: int = BCRYPT_ROUNDS, samples: int = 3) -> float:
+    """测量单次哈希耗时（毫秒），取多次采样的最小值"""
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hash_password("myledger-benchmark", rounds)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建 JWT Token"""
     to_encode = data.copy()
@@ -42,10 +134,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def decode_token(token: str) -> dict:
-    """解码 JWT Token"""
+def decode_token(token: str, scope: Optional[str] = None) -> dict:
+    """
+    解码 JWT Token
+    scope 为 None 时只接受登录获得的访问令牌，专用令牌（如统计推送令牌）需要指定对应的 scope
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("scope") != scope:
+            raise JWTError("token scope mismatch")
         return {
             "username": payload.get("sub"),
             "user_id": payload.get("user_id")
@@ -77,6 +174,11 @@ async def get_current_user(
     else:
         token = authorization
     
+    return await authenticate_token(token, db)
+
+
+async def authenticate_token(token: str, db: Session, scope: Optional[str] = None) -> User:
+    """校验令牌并返回对应的有效用户"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证用户身份",
@@ -84,7 +186,7 @@ async def get_current_user(
     )
     
     try:
-        token_data = decode_token(token)
+        token_data = decode_token(token, scope)
         username = token_data.get("username")
         if username is None:
             raise credentials_exception
@@ -145,12 +247,10 @@ async def register(
         )
     
     # 检查是否是第一个用户（管理员）
-    user_count = db.query(User).count()
-    is_first_user = user_count == 0
+    is_first_user = db.query(User.id).first() is None
     
-    # 创建用户 - 使用 bcrypt 直接加密
-    salt = bcrypt.gensalt(rounds=12)
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    # 创建用户 - 使用 bcrypt 加密
+    hashed_password = await run_bcrypt(hash_password, password)
     
     new_user = User(
         username=username,
@@ -171,6 +271,7 @@ async def register(
 
 @router.post("/login", response_model=LoginResponse, summary="用户登录")
 async def login(
+    background_tasks: BackgroundTasks,
     username: str = Form(..., description="账号名"),
     password: str = Form(..., description="密码"),
     db: Session = Depends(get_db)
@@ -182,12 +283,13 @@ async def login(
     - password: 密码
     
     返回 JWT Token
+    密码哈希的代价因子与当前配置不一致时，登录成功后在后台重新加密
     """
     # 查找用户
     user = db.query(User).filter(User.username == username).first()
     
     # 验证密码
-    if not user or not bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8')):
+    if not user or not await run_bcrypt(verify_password, password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -201,6 +303,14 @@ async def login(
             detail="账户已禁用"
         )
     
+    # 计入当日活跃与登录次数
+    counters.record_login(db, user.id)
+    db.commit()
+    
+    # 代价因子变化时透明升级哈希
+    if needs_rehash(user.password_hash):
+        background_tasks.add_task(rehash_password, user.id, password, user.password_hash)
+    
     # 创建 Token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -3,12 +3,16 @@
 分类和二级分类的 CRUD API
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import os
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 
 from ..database import get_db
 from ..models import Category, CategoryItem, PaymentMethod
+from ..cache import reference_cache
+from ..responses import cached_body, conditional_response
 from ..schemas.category import (
     CategoryCreate, CategoryUpdate, CategoryResponse,
     CategoryItemCreate, CategoryItemUpdate, CategoryItemResponse,
@@ -18,6 +22,26 @@ from ..schemas.category import (
 
 router = APIRouter(prefix="/api/v1/categories", tags=["分类"])
 
+# 公开的参考数据读取接口允许客户端和 nginx 缓存的时间（秒），过期后以 ETag 重新验证
+REFERENCE_CACHE_SECONDS = int(os.getenv("REFERENCE_CACHE_SECONDS", "300"))
+REFERENCE_CACHE_CONTROL = f"public, max-age={REFERENCE_CACHE_SECONDS}"
+
+
+def reference_response(request: Request, key: str, build) -> Response:
+    """
+    参考数据读取接口的响应
+    序列化结果按 reference 数据版本缓存在内存中，
+    条件请求直接比较缓存的 ETag / Last-Modified 返回 304，不查询数据库；
+    Last-Modified 取 reference 数据版本最后一次递增的时间
+    """
+    cached = reference_cache.derived(key, lambda: cached_body(build(), reference_cache.updated_at))
+    return conditional_response(request, cached, REFERENCE_CACHE_CONTROL)
+
+
+def serialize_list(schema, rows) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
 
 # ============ 一级分类 API ============
 
@@ -28,6 +52,7 @@ router = APIRouter(prefix="/api/v1/categories", tags=["分类"])
 
 @router.get("/items", response_model=List[CategoryItemResponse], summary="获取所有二级分类")
 async def get_all_items(
+    request: Request,
     category_id: int = Query(None, description="一级分类ID"),
     db: Session = Depends(get_db)
 ):
@@ -35,50 +60,71 @@ async def get_all_items(
     获取二级分类列表
     - category_id: 筛选一级分类
     """
-    query = db.query(CategoryItem)
-    if category_id:
-        query = query.filter(CategoryItem.category_id == category_id)
-    return query.order_by(CategoryItem.sort_order).all()
+    if category_id and reference_cache.category(category_id) is None:
+        # 不存在的分类结果都为空，共用一个缓存项
+        category_id = -1
+
+    def build() -> bytes:
+        query = db.query(CategoryItem)
+        if category_id:
+            query = query.filter(CategoryItem.category_id == category_id)
+        return serialize_list(CategoryItemResponse, query.order_by(CategoryItem.sort_order).all())
+
+    return reference_response(request, f"category_items:{category_id or ''}", build)
 
 @router.get("/payment-methods", response_model=List[PaymentMethodResponse], summary="获取支付方式")
-async def get_payment_methods(db: Session = Depends(get_db)):
+async def get_payment_methods(request: Request, db: Session = Depends(get_db)):
     """获取所有支付方式"""
-    return db.query(PaymentMethod).order_by(PaymentMethod.sort_order).all()
+    return reference_response(request, "payment_methods", lambda: serialize_list(
+        PaymentMethodResponse, db.query(PaymentMethod).order_by(PaymentMethod.sort_order).all()
+    ))
 
 
 
 @router.get("/list", response_model=List[CategoryResponse], summary="获取分类列表")
 async def get_category_list(
+    request: Request,
     type: str = Query(None, description="筛选类型 (expense/income)"),
     db: Session = Depends(get_db)
 ):
     """获取分类列表"""
-    query = db.query(Category)
-    if type:
-        query = query.filter(Category.type == type)
-    return query.order_by(Category.sort_order).all()
+    if type and type not in {c.type for c in reference_cache.data.categories.values()}:
+        # 不存在的类型结果都为空，共用一个缓存项
+        type = "-"
+
+    def build() -> bytes:
+        query = db.query(Category)
+        if type:
+            query = query.filter(Category.type == type)
+        return serialize_list(CategoryResponse, query.order_by(Category.sort_order).all())
+
+    return reference_response(request, f"category_list:{type or ''}", build)
 
 
 # ============ 主路由 ============
 
 @router.get("", response_model=CategoriesListResponse, summary="获取所有分类")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, db: Session = Depends(get_db)):
     """
     获取所有分类（支出+收入）
     包含二级分类
-    """
-    expense_categories = db.query(Category).filter(
-        Category.type == 'expense'
-    ).order_by(Category.sort_order).all()
     
-    income_categories = db.query(Category).filter(
-        Category.type == 'income'
+    分类树序列化后缓存，分类或二级分类变更时失效
+    """
+    return reference_response(request, "category_tree", lambda: build_category_tree(db))
+
+
+def build_category_tree(db: Session) -> bytes:
+    """一次性加载分类及二级分类（selectinload，共两条查询）并序列化为 JSON"""
+    categories = db.query(Category).options(
+        selectinload(Category.items)
     ).order_by(Category.sort_order).all()
     
-    return {
-        "expense": expense_categories,
-        "income": income_categories
-    }
+    tree = CategoriesListResponse.model_validate({
+        "expense": [c for c in categories if c.type == 'expense'],
+        "income": [c for c in categories if c.type == 'income'],
+    }, from_attributes=True)
+    return tree.model_dump_json().encode('utf-8')
 
 
 
@@ -121,6 +167,7 @@ async def create_category(
     )
     db.add(db_category)
     db.commit()
+    reference_cache.invalidate()
     db.refresh(db_category)
     
     return db_category
@@ -146,6 +193,7 @@ async def update_category(
         setattr(category, field, value)
     
     db.commit()
+    reference_cache.invalidate()
     db.refresh(category)
     
     return category
@@ -163,6 +211,7 @@ async def delete_category(category_id: int, db: Session = Depends(get_db)):
     
     db.delete(category)
     db.commit()
+    reference_cache.invalidate()
     
     return MessageResponse(message="删除成功")
 
@@ -198,6 +247,16 @@ async def create_item(
             detail="一级分类不存在"
         )
     
+    existing = db.query(CategoryItem).filter(
+        CategoryItem.category_id == item.category_id,
+        CategoryItem.name == item.name
+    ).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="二级分类名称已存在"
+        )
+    
     db_item = CategoryItem(
         category_id=item.category_id,
         name=item.name,
@@ -206,6 +265,7 @@ async def create_item(
     )
     db.add(db_item)
     db.commit()
+    reference_cache.invalidate()
     db.refresh(db_item)
     
     return db_item
@@ -226,10 +286,22 @@ async def update_item(
         )
     
     update_data = item_update.model_dump(exclude_unset=True)
+    if update_data.get('name') and update_data['name'] != item.name:
+        existing = db.query(CategoryItem).filter(
+            CategoryItem.category_id == item.category_id,
+            CategoryItem.name == update_data['name']
+        ).first()
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="二级分类名称已存在"
+            )
+
     for field, value in update_data.items():
         setattr(item, field, value)
     
     db.commit()
+    reference_cache.invalidate()
     db.refresh(item)
     
     return item
@@ -247,6 +319,7 @@ async def delete_item(item_id: int, db: Session = Depends(get_db)):
     
     db.delete(item)
     db.commit()
+    reference_cache.invalidate()
     
     return MessageResponse(message="删除成功")
 
@@ -273,6 +346,7 @@ async def create_payment_method(
     )
     db.add(db_pm)
     db.commit()
+    reference_cache.invalidate()
     db.refresh(db_pm)
     
     return db_pm
@@ -297,6 +371,7 @@ async def update_payment_method(
         setattr(pm, field, value)
     
     db.commit()
+    reference_cache.invalidate()
     db.refresh(pm)
     
     return pm
@@ -314,5 +389,6 @@ async def delete_payment_method(pm_id: int, db: Session = Depends(get_db)):
     
     db.delete(pm)
     db.commit()
+    reference_cache.invalidate()
     
     return MessageResponse(message="删除成功")
@@ -3,44 +3,205 @@
 项目 CRUD API
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import List, Optional
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..models import Project, Record, User
 from ..schemas.project import (
     ProjectCreate, ProjectUpdate, ProjectResponse,
-    ProjectDetailResponse, ProjectListResponse, MessageResponse
+    ProjectDetailResponse, ProjectListResponse, ProjectRecordPage,
+    BurndownResponse, MessageResponse
 )
+from ..cache import reference_cache, data_versions, project_scope, VersionedCache
+from .. import cascade
+from ..jobs import JobContext, enqueue, job_handler
+from ..pagination import encode_cursor, before_cursor
+from ..responses import FastJSONResponse
 from .auth import get_current_user
 
 router = APIRouter(prefix="/api/v1/projects", tags=["项目"])
 
+# 项目详情中内嵌的记录条数
+DETAIL_RECORDS_LIMIT = 20
+
+# 燃尽图缓存: project_id -> (项目数据版本, 日期) -> 结果
+burndown_cache = VersionedCache(maxsize=1024, name="burndown")
+
+CENT = Decimal('0.01')
+
+
+def get_record_page(db: Session, project_id: int, limit: int, cursor: Optional[str] = None) -> dict:
+    """按 (date, id) 倒序的键集分页，多取一条判断是否还有下一页"""
+    query = db.query(Record).filter(Record.project_id == project_id)
+    if cursor:
+        query = query.filter(before_cursor(Record.date, Record.id, cursor))
+    
+    records = query.order_by(Record.date.desc(), Record.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(records) > limit:
+        last = records[limit - 1]
+        next_cursor = encode_cursor(last.date, last.id)
+    return {"records": records[:limit], "next_cursor": next_cursor}
+
+
+def get_project_breakdowns(db: Session, project_id: int) -> dict:
+    """按分类、支付方式、日期分组汇总项目记录"""
+    amount = func.sum(Record.amount).label('amount')
+    count = func.count(Record.id).label('count')
+    
+    by_category = []
+    for r in db.query(Record.category_id, amount, count).filter(
+        Record.project_id == project_id
+    ).group_by(Record.category_id).order_by(amount.desc()):
+        category = reference_cache.category(r.category_id)
+        by_category.append({
+            "id": r.category_id,
+            "name": category.name if category else None,
+            "icon": category.icon if category else None,
+            "amount": r.amount,
+            "count": r.count,
+        })
+    
+    by_payment_method = []
+    for r in db.query(Record.payment_method_id, amount, count).filter(
+        Record.project_id == project_id
+    ).group_by(Record.payment_method_id).order_by(amount.desc()):
+        pm = reference_cache.payment_method(r.payment_method_id)
+        by_payment_method.append({
+            "id": r.payment_method_id,
+            "name": pm.name if pm else None,
+            "icon": pm.icon if pm else None,
+            "amount": r.amount,
+            "count": r.count,
+        })
+    
+    day = func.date(Record.date)
+    by_day = [
+        {"date": r.date, "amount": r.amount, "count": r.count}
+        for r in db.query(day.label('date'), amount, count).filter(
+            Record.project_id == project_id
+        ).group_by(day).order_by(day)
+    ]
+    
+    return {
+        "record_count": sum(c["count"] for c in by_category),
+        "by_category": by_category,
+        "by_payment_method": by_payment_method,
+        "by_day": by_day,
+    }
+
+
+@job_handler("recompute_project_total", concurrency=2)
+def recompute_project_total(ctx: JobContext, project_id: int):
+    """后台任务：按关联记录重算项目总消费（项目已删除时不影响任何行）"""
+    db = SessionLocal()
+    try:
+        total = db.query(func.sum(Record.amount)).filter(Record.project_id == project_id).scalar() or 0
+        db.query(Project).filter(Project.id == project_id).update(
+            {Project.total_expense: total}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def enqueue_total_recompute(db: Session, *project_ids: Optional[int]):
+    """记录变更后登记项目总消费重算，随调用方的事务提交；同一项目待执行的任务合并为一个"""
+    for project_id in {pid for pid in project_ids if pid}:
+        enqueue(db, "recompute_project_total", unique=True, project_id=project_id)
+
+
+def project_summary(project: Project) -> dict:
+    """构建项目响应（ProjectResponse 结构的 dict）"""
+    return {
+        "id": project.id,
+        "user_id": project.user_id,
+        "title": project.title,
+        "start_date": project.start_date,
+        "end_date": project.end_date,
+        "budget": project.budget,
+        "member_count": project.member_count,
+        "total_expense": project.total_expense,
+        "status": project.status,
+        "description": project.description,
+        "created_at": project.created_at,
+        "updated_at": project.updated_at,
+    }
+
 
 @router.get("", response_model=ProjectListResponse, summary="获取项目列表")
 async def get_projects(
     status: Optional[str] = None,
+    sort: str = Query("created", description="排序: created(创建时间) / activity(最近记录)"),
+    page: Optional[int] = Query(None, ge=1, description="页码，不传则返回全部"),
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     获取当前用户的项目列表
     - status: 筛选状态 (ongoing/completed)
+    - 每个项目附带记录数、已花费、剩余预算、人均消费和最近记录日期，
+      由一条 LEFT JOIN + GROUP BY 查询计算
     """
-    query = db.query(Project).filter(Project.user_id == current_user.id)
+    record_count = func.count(Record.id).label('record_count')
+    spent = func.sum(Record.amount).label('spent')
+    last_record_date = func.max(Record.date).label('last_record_date')
+    
+    query = db.query(Project, record_count, spent, last_record_date).outerjoin(
+        Record, Record.project_id == Project.id
+    ).filter(Project.user_id == current_user.id)
     
     if status:
         query = query.filter(Project.status == status)
     
-    projects = query.order_by(Project.created_at.desc()).all()
+    query = query.group_by(Project.id)
     
-    return {
+    if sort == "activity":
+        query = query.order_by(
+            func.coalesce(last_record_date, Project.created_at).desc(),
+            Project.id.desc()
+        )
+    else:
+        query = query.order_by(Project.created_at.desc())
+    
+    if page is not None:
+        total_query = db.query(func.count(Project.id)).filter(Project.user_id == current_user.id)
+        if status:
+            total_query = total_query.filter(Project.status == status)
+        total = total_query.scalar()
+        rows = query.offset((page - 1) * page_size).limit(page_size).all()
+    else:
+        rows = query.all()
+        total = len(rows)
+    
+    projects = []
+    for project, count, amount, last_date in rows:
+        amount = amount if amount is not None else Decimal('0.00')
+        item = project_summary(project)
+        item.update({
+            "record_count": count,
+            "spent": amount,
+            "remaining_budget": project.budget - amount,
+            "per_member_spend": (
+                (amount / project.member_count).quantize(Decimal('0.01'))
+                if project.member_count > 0 else Decimal('0.00')
+            ),
+            "last_record_date": last_date,
+        })
+        projects.append(item)
+    
+    return FastJSONResponse({
         "projects": projects,
-        "total": len(projects)
-    }
+        "total": total,
+        "page": page,
+        "page_size": page_size if page is not None else None
+    })
 
 
 @router.get("/{project_id}", response_model=ProjectDetailResponse, summary="获取项目详情")
@@ -49,7 +210,11 @@ async def get_project(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取项目详情（包含关联记录）"""
+    """
+    获取项目详情
+    - 按分类、支付方式、日期的汇总
+    - 第一页关联记录，其余通过 /projects/{id}/records 游标分页获取
+    """
     project = db.query(Project).filter(
         Project.id == project_id,
         Project.user_id == current_user.id
@@ -71,10 +236,8 @@ async def get_project(
     if project.budget > 0:
         expense_rate = float(project.total_expense / project.budget * 100)
     
-    # 获取关联记录
-    records = db.query(Record).filter(
-        Record.project_id == project_id
-    ).order_by(Record.date.desc(), Record.id.desc()).all()
+    breakdowns = get_project_breakdowns(db, project_id)
+    page = get_record_page(db, project_id, DETAIL_RECORDS_LIMIT)
     
     return ProjectDetailResponse(
         id=project.id,
@@ -91,10 +254,124 @@ async def get_project(
         updated_at=project.updated_at,
         avg_expense=avg_expense,
         expense_rate=expense_rate,
-        records=records
+        **breakdowns,
+        **page
     )
 
 
+@router.get("/{project_id}/records", response_model=ProjectRecordPage, summary="获取项目记录")
+async def get_project_records(
+    project_id: int,
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    limit: int = Query(DETAIL_RECORDS_LIMIT, ge=1, le=100, description="每页数量"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """项目关联记录，按日期倒序游标分页"""
+    project_exists = db.query(Project.id).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="项目不存在"
+        )
+    
+    return get_record_page(db, project_id, limit, cursor)
+
+
+@router.get("/{project_id}/burndown", response_model=BurndownResponse, summary="项目预算燃尽图")
+async def get_project_burndown(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    项目预算燃尽图
+    - 每日消费及累计消费（一条 GROUP BY 查询 + 窗口函数累计求和）
+    - 从开始到结束日期的线性预算线
+    - 按已过天数的平均速度推算结束时总消费，以及人均消费
+    结果按项目数据版本缓存，项目或其记录变更后失效
+    """
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="项目不存在"
+        )
+    
+    today = date.today()
+    version = (data_versions.get(project_scope(project_id)), today)
+    cached = burndown_cache.get(project_id, version)
+    if cached is not None:
+        return FastJSONResponse(cached)
+    
+    day = func.date(Record.date)
+    daily = func.sum(Record.amount)
+    rows = db.query(
+        day.label('date'),
+        daily.label('spent'),
+        func.sum(daily).over(order_by=day).label('cumulative')
+    ).filter(
+        Record.project_id == project_id
+    ).group_by(day).order_by(day).all()
+    by_date = {date.fromisoformat(r.date): r for r in rows}
+    
+    # 覆盖项目周期以及周期外的记录
+    first_day = min([project.start_date] + list(by_date))
+    last_day = max([project.end_date] + list(by_date))
+    total_days = (project.end_date - project.start_date).days + 1
+    budget = project.budget
+    
+    days = []
+    cumulative = Decimal('0.00')
+    current = first_day
+    while current <= last_day:
+        row = by_date.get(current)
+        if row is not None:
+            cumulative = row.cumulative
+        planned_days = min(max((current - project.start_date).days + 1, 0), total_days)
+        days.append({
+            "date": current,
+            "spent": row.spent if row is not None else Decimal('0.00'),
+            "cumulative": cumulative,
+            "budget_line": (budget * planned_days / total_days).quantize(CENT),
+        })
+        current += timedelta(days=1)
+    
+    # 推算: 已完成或已结束的项目按实际消费，否则按日均速度外推
+    spent = cumulative
+    elapsed_days = min(max((today - project.start_date).days + 1, 0), total_days)
+    if project.status == "completed" or elapsed_days in (0, total_days):
+        projected = spent
+    else:
+        projected = (spent / elapsed_days * total_days).quantize(CENT)
+    
+    result = {
+        "project_id": project.id,
+        "budget": budget,
+        "start_date": project.start_date,
+        "end_date": project.end_date,
+        "total_days": total_days,
+        "elapsed_days": elapsed_days,
+        "spent": spent,
+        "projected_spend": projected,
+        "per_member_average": (
+            (spent / project.member_count).quantize(CENT) if project.member_count > 0 else Decimal('0.00')
+        ),
+        "over_budget": projected > budget,
+        "days": days,
+    }
+    burndown_cache.set(project_id, version, result)
+    return FastJSONResponse(result)
+
+
 @router.post("", response_model=ProjectResponse, summary="创建项目")
 async def create_project(
     project: ProjectCreate,
@@ -193,22 +470,23 @@ async def update_project(
 @router.delete("/{project_id}", response_model=MessageResponse, summary="删除项目")
 async def delete_project(
     project_id: int,
+    mode: str = Query("detach", pattern="^(detach|purge)$", description="detach: 保留记录并解除关联; purge: 删除关联记录"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """删除项目（级联删除关联记录）"""
-    project = db.query(Project).filter(
+    """删除项目（关联记录按 mode 解除关联或一并删除，集合操作单事务完成）"""
+    project_exists = db.query(Project.id).filter(
         Project.id == project_id,
         Project.user_id == current_user.id
     ).first()
     
-    if not project:
+    if not project_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="项目不存在"
         )
     
-    db.delete(project)
+    cascade.delete_project(db, project_id, purge=(mode == "purge"))
     db.commit()
     
     return MessageResponse(message="删除成功")
@@ -3,20 +3,27 @@
 记账 CRUD API
 """
 
+import csv
+import io
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import date, datetime
 
-from ..database import get_db
-from ..models import Record, User, Category, CategoryItem, PaymentMethod
+from ..database import get_db, SessionLocal
+from ..models import Record, User, Project
+from ..cache import reference_cache
+from ..responses import FastJSONResponse
+from ..events import stats_stream, snapshot
 from ..schemas.record import (
     RecordCreate, RecordUpdate, RecordResponse,
     RecordDetailResponse, RecordListResponse, RecordStatsResponse,
     MessageResponse
 )
 from .auth import get_current_user
+from .projects import enqueue_total_recompute
 
 router = APIRouter(prefix="/api/v1/records", tags=["记账"])
 
@@ -31,6 +38,55 @@ def parse_date(date_str: Optional[str]) -> Optional[datetime]:
         return None
 
 
+def validate_reference(category_id: Optional[int], category_item_id: Optional[int],
+                       payment_method_id: Optional[int] = None):
+    """使用参考数据缓存校验分类、二级分类和支付方式"""
+    if category_id is not None and not reference_cache.category(category_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="一级分类不存在"
+        )
+    
+    if category_item_id is not None:
+        item = reference_cache.item(category_item_id)
+        if not item or (category_id is not None and item.category_id != category_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="二级分类不存在"
+            )
+    
+    if payment_method_id is not None and not reference_cache.payment_method(payment_method_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="支付方式不存在"
+        )
+
+
+def record_detail(record: Record, project_title: Optional[str] = None) -> dict:
+    """
+    构建记账详情（RecordDetailResponse 结构的 dict）
+    分类和支付方式名称从缓存中解析
+    """
+    return {
+        "id": record.id,
+        "user_id": record.user_id,
+        "type": record.type,
+        "category_id": record.category_id,
+        "category_item_id": record.category_item_id,
+        "amount": record.amount,
+        "date": record.date,
+        "remark": record.remark,
+        "payment_method_id": record.payment_method_id,
+        "project_id": record.project_id,
+        "created_at": record.created_at,
+        "updated_at": record.updated_at,
+        "category_name": reference_cache.category_name(record.category_id),
+        "category_item_name": reference_cache.item_name(record.category_item_id),
+        "payment_method_name": reference_cache.payment_method_name(record.payment_method_id),
+        "project_title": project_title,
+    }
+
+
 @router.get("", response_model=RecordListResponse, summary="获取记账列表")
 async def get_records(
     type: Optional[str] = Query(None, description="类型: income/expense"),
@@ -78,64 +134,103 @@ async def get_records(
     offset = (page - 1) * page_size
     records = query.order_by(Record.date.desc(), Record.id.desc()).offset(offset).limit(page_size).all()
     
-    # 构建响应
-    record_responses = []
-    for record in records:
-        # 获取分类名称
-        category_name = None
-        if record.category_id:
-            category = db.query(Category.name).filter(Category.id == record.category_id).first()
-            if category:
-                category_name = category[0]
-        
-        # 获取二级分类名称
-        category_item_name = None
-        if record.category_item_id:
-            item = db.query(CategoryItem.name).filter(CategoryItem.id == record.category_item_id).first()
-            if item:
-                category_item_name = item[0]
-        
-        # 获取支付方式名称
-        payment_method_name = None
-        if record.payment_method_id:
-            pm = db.query(PaymentMethod.name).filter(PaymentMethod.id == record.payment_method_id).first()
-            if pm:
-                payment_method_name = pm[0]
-        
-        # 获取项目标题
-        project_title = None
-        if record.project_id:
-            from ..models import Project
-            project = db.query(Project.title).filter(Project.id == record.project_id).first()
-            if project:
-                project_title = project[0]
-        
-        record_responses.append(RecordDetailResponse(
-            id=record.id,
-            user_id=record.user_id,
-            type=record.type,
-            category_id=record.category_id,
-            category_item_id=record.category_item_id,
-            amount=record.amount,
-            date=record.date,
-            remark=record.remark,
-            payment_method_id=record.payment_method_id,
-            project_id=record.project_id,
-            project_title=project_title,
-            category_name=category_name,
-            category_item_name=category_item_name,
-            payment_method_name=payment_method_name,
-            created_at=record.created_at,
-            updated_at=record.updated_at,
-        ))
+    # 项目标题一次查询，其余名称从参考数据缓存解析
+    project_ids = {r.project_id for r in records if r.project_id}
+    project_titles = {}
+    if project_ids:
+        project_titles = dict(
+            db.query(Project.id, Project.title).filter(Project.id.in_(project_ids)).all()
+        )
     
-    return {
+    record_responses = [
+        record_detail(record, project_titles.get(record.project_id))
+        for record in records
+    ]
+    
+    # 直接渲染，跳过 response_model 的重复校验
+    return FastJSONResponse({
         "records": record_responses,
         "total": total,
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size if total > 0 else 0
-    }
+    })
+
+
+# 导出时每批从数据库读取的行数
+EXPORT_BATCH_SIZE = 1000
+EXPORT_HEADER = ["日期", "类型", "金额", "一级分类", "二级分类", "支付方式", "项目", "备注"]
+TYPE_LABELS = {"income": "收入", "expense": "支出"}
+
+
+def iter_records_csv(user_id: int, start: Optional[datetime], end: Optional[datetime]) -> Iterator[bytes]:
+    """
+    逐批生成 CSV（UTF-8 BOM，便于 Excel 直接打开）
+    响应体发送时请求依赖的会话已关闭，这里使用独立会话
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADER)
+    yield flush()
+
+    db = SessionLocal()
+    try:
+        project_titles = dict(
+            db.query(Project.id, Project.title).filter(Project.user_id == user_id).all()
+        )
+        query = db.query(
+            Record.date, Record.type, Record.amount, Record.category_id,
+            Record.category_item_id, Record.payment_method_id, Record.project_id, Record.remark
+        ).filter(Record.user_id == user_id)
+        if start:
+            query = query.filter(Record.date >= start)
+        if end:
+            query = query.filter(Record.date <= end)
+
+        rows = 0
+        for row in query.order_by(Record.date, Record.id).yield_per(EXPORT_BATCH_SIZE):
+            writer.writerow([
+                row.date.strftime("%Y-%m-%d"),
+                TYPE_LABELS.get(row.type, row.type),
+                row.amount,
+                reference_cache.category_name(row.category_id) or "",
+                reference_cache.item_name(row.category_item_id) or "",
+                reference_cache.payment_method_name(row.payment_method_id) or "",
+                project_titles.get(row.project_id, ""),
+                row.remark or "",
+            ])
+            rows += 1
+            if rows % EXPORT_BATCH_SIZE == 0:
+                yield flush()
+        yield flush()
+    finally:
+        db.close()
+
+
+@router.get("/export", summary="导出记账记录（CSV）")
+async def export_records(
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式导出当前用户的记账记录
+    不在内存中拼接完整文件，客户端支持时由压缩中间件逐块压缩
+    """
+    filename = f"records-{date.today():%Y%m%d}.csv"
+    return StreamingResponse(
+        iter_records_csv(current_user.id, parse_date(start_date), parse_date(end_date)),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/{record_id}", response_model=RecordDetailResponse, summary="获取记账详情")
@@ -156,21 +251,7 @@ async def get_record(
             detail="记账记录不存在"
         )
     
-    return RecordDetailResponse(
-        id=record.id,
-        user_id=record.user_id,
-        type=record.type,
-        category_id=record.category_id,
-        category_item_id=record.category_item_id,
-        amount=record.amount,
-        date=record.date,
-        remark=record.remark,
-        payment_method_id=record.payment_method_id,
-        project_id=record.project_id,
-        project_title=None,
-        created_at=record.created_at,
-        updated_at=record.updated_at,
-    )
+    return record_detail(record)
 
 
 @router.post("", response_model=RecordDetailResponse, summary="创建记账")
@@ -180,25 +261,8 @@ async def create_record(
     db: Session = Depends(get_db)
 ):
     """创建新记账"""
-    from ..models import Category, CategoryItem, Project
-    
-    # 验证分类存在
-    category = db.query(Category).filter(Category.id == record.category_id).first()
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="一级分类不存在"
-        )
-    
-    item = db.query(CategoryItem).filter(
-        CategoryItem.id == record.category_item_id,
-        CategoryItem.category_id == record.category_id
-    ).first()
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="二级分类不存在"
-        )
+    # 验证分类和支付方式存在
+    validate_reference(record.category_id, record.category_item_id, record.payment_method_id)
     
     # 如果指定了项目，验证项目存在且属于当前用户
     if record.project_id:
@@ -232,34 +296,13 @@ async def create_record(
     )
     
     db.add(db_record)
+    # 关联了项目时在后台重算项目总消费
+    enqueue_total_recompute(db, record.project_id)
     db.commit()
     db.refresh(db_record)
+    stats_stream.record_changed(current_user.id, None, snapshot(db_record))
     
-    # 如果关联了项目，更新项目总消费
-    if record.project_id:
-        total = db.query(func.sum(Record.amount)).filter(
-            Record.project_id == record.project_id
-        ).scalar() or 0
-        project = db.query(Project).filter(Project.id == record.project_id).first()
-        if project:
-            project.total_expense = total
-            db.commit()
-    
-    return RecordDetailResponse(
-        id=db_record.id,
-        user_id=db_record.user_id,
-        type=db_record.type,
-        category_id=db_record.category_id,
-        category_item_id=db_record.category_item_id,
-        amount=db_record.amount,
-        date=db_record.date,
-        remark=db_record.remark,
-        payment_method_id=db_record.payment_method_id,
-        project_id=db_record.project_id,
-        project_title=None,
-        created_at=db_record.created_at,
-        updated_at=db_record.updated_at,
-    )
+    return record_detail(db_record)
 
 
 @router.put("/{record_id}", response_model=RecordDetailResponse, summary="更新记账")
@@ -282,27 +325,29 @@ async def update_record(
         )
     
     update_data = record_update.model_dump(exclude_unset=True)
+    
+    # 分类变更时校验（二级分类需属于最终的一级分类）
+    if 'category_id' in update_data or 'category_item_id' in update_data:
+        validate_reference(
+            update_data.get('category_id', record.category_id),
+            update_data.get('category_item_id', record.category_item_id)
+        )
+    if update_data.get('payment_method_id') is not None:
+        validate_reference(None, None, update_data['payment_method_id'])
+    
+    old_project_id = record.project_id
+    previous = snapshot(record)
     for field, value in update_data.items():
         setattr(record, field, value)
     
+    # 金额或所属项目变化时在后台重算相关项目的总消费
+    if 'amount' in update_data or 'project_id' in update_data:
+        enqueue_total_recompute(db, old_project_id, record.project_id)
     db.commit()
     db.refresh(record)
+    stats_stream.record_changed(current_user.id, previous, snapshot(record))
     
-    return RecordDetailResponse(
-        id=record.id,
-        user_id=record.user_id,
-        type=record.type,
-        category_id=record.category_id,
-        category_item_id=record.category_item_id,
-        amount=record.amount,
-        date=record.date,
-        remark=record.remark,
-        payment_method_id=record.payment_method_id,
-        project_id=record.project_id,
-        project_title=None,
-        created_at=record.created_at,
-        updated_at=record.updated_at,
-    )
+    return record_detail(record)
 
 
 @router.delete("/{record_id}", response_model=MessageResponse, summary="删除记账")
@@ -323,20 +368,11 @@ async def delete_record(
             detail="记账记录不存在"
         )
     
-    project_id = record.project_id
-    
+    previous = snapshot(record)
     db.delete(record)
+    enqueue_total_recompute(db, record.project_id)
     db.commit()
-    
-    if project_id:
-        from ..models import Project
-        total = db.query(func.sum(Record.amount)).filter(
-            Record.project_id == project_id
-        ).scalar() or 0
-        project = db.query(Project).filter(Project.id == project_id).first()
-        if project:
-            project.total_expense = total
-            db.commit()
+    stats_stream.record_changed(current_user.id, previous, None)
     
     return MessageResponse(message="删除成功")
 
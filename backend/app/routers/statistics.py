@@ -3,7 +3,9 @@
 多维度统计 API
 """
 
-from fastapi import APIRouter, Depends, Query
+import asyncio
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case
 from typing import Optional, List
@@ -11,8 +13,13 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 
 from ..database import get_db
-from ..models import Record, User, Category, CategoryItem
-from .auth import get_current_user
+from ..models import Record, User, Project
+from ..cache import reference_cache
+from ..events import stats_stream, SSE_HEARTBEAT_SECONDS, SSE_MAX_SECONDS
+from .auth import (
+    get_current_user, authenticate_token, create_access_token,
+    STREAM_TOKEN_SCOPE, STREAM_TOKEN_EXPIRE_SECONDS
+)
 
 router = APIRouter(prefix="/api/v1/statistics", tags=["统计"])
 
@@ -93,8 +100,8 @@ async def get_by_category(
     - 返回一级分类汇总
     - 包含各分类的金额和占比
     """
-    # 子查询：按分类汇总
-    subquery = db.query(
+    # 按分类汇总
+    query = db.query(
         Record.category_id,
         func.sum(Record.amount).label('amount'),
         func.count(Record.id).label('count')
@@ -104,41 +111,42 @@ async def get_by_category(
     if start_date:
         start = parse_date(start_date)
         if start:
-            subquery = subquery.filter(Record.date >= start)
+            query = query.filter(Record.date >= start)
     
     if end_date:
         end = parse_date(end_date)
         if end:
             end = end + timedelta(days=1)
-            subquery = subquery.filter(Record.date < end)
+            query = query.filter(Record.date < end)
     
     if record_type:
-        subquery = subquery.filter(Record.type == record_type)
+        query = query.filter(Record.type == record_type)
     
-    subquery = subquery.group_by(Record.category_id).subquery()
+    # 按 category_id + 0 分组: 直接按列分组时 SQLite 会选择 ix_records_category_created
+    # 以省去排序，结果是全表扫描；表达式分组让查询走 user_id 索引
+    totals = {
+        r.category_id: r for r in query.group_by(Record.category_id + 0).all()
+    }
     
-    # 关联分类信息
-    results = db.query(
-        Category.id,
-        Category.name,
-        Category.icon,
-        func.coalesce(subquery.c.amount, 0).label('amount'),
-        func.coalesce(subquery.c.count, 0).label('count')
-    ).outerjoin(subquery, Category.id == subquery.c.category_id).all()
+    # 关联分类信息（来自参考数据缓存，包含无记录的分类）
+    results = []
+    for category in sorted(reference_cache.data.categories.values(), key=lambda c: c.id):
+        row = totals.get(category.id)
+        results.append((category, row.amount if row else 0, row.count if row else 0))
     
     # 计算总数
-    total_amount = sum(float(r.amount) for r in results if r.amount) or 1
+    total_amount = sum(float(amount) for _, amount, _ in results if amount) or 1
     
     # 构建响应
     categories = []
-    for r in results:
-        amount = float(r.amount) if r.amount else 0
+    for category, amount, count in results:
+        amount = float(amount) if amount else 0
         categories.append({
-            "id": r.id,
-            "name": r.name,
-            "icon": r.icon,
+            "id": category.id,
+            "name": category.name,
+            "icon": category.icon,
             "amount": amount,
-            "count": r.count,
+            "count": count,
             "percentage": round(amount / total_amount * 100, 2) if total_amount > 0 else 0
         })
     
@@ -219,13 +227,16 @@ async def get_by_project(
     按项目统计
     - 返回项目消费汇总
     """
-    # 查询有项目关联的记录
+    # 查询有项目关联的记录，同时取出项目标题和状态
     query = db.query(
         Record.project_id,
+        Project.title,
+        Project.status,
         func.sum(Record.amount).label('total')
+    ).join(
+        Project, Project.id == Record.project_id
     ).filter(
-        Record.user_id == current_user.id,
-        Record.project_id.isnot(None)
+        Record.user_id == current_user.id
     )
     
     # 日期筛选
@@ -240,21 +251,18 @@ async def get_by_project(
             end = end + timedelta(days=1)
             query = query.filter(Record.date < end)
     
-    query = query.group_by(Record.project_id)
+    query = query.group_by(Record.project_id, Project.title, Project.status)
     results = query.all()
     
-    # 获取项目信息
-    project_data = []
-    for r in results:
-        from ..models import Project
-        project = db.query(Project).filter(Project.id == r.project_id).first()
-        if project:
-            project_data.append({
-                "project_id": r.project_id,
-                "project_title": project.title,
-                "total": float(r.total),
-                "status": project.status
-            })
+    project_data = [
+        {
+            "project_id": r.project_id,
+            "project_title": r.title,
+            "total": float(r.total),
+            "status": r.status
+        }
+        for r in results
+    ]
     
     return {
         "projects": project_data,
@@ -320,3 +328,57 @@ async def get_trend(
         "data": trend_data,
         "period": period
     }
+
+
+@router.post("/stream-token", summary="获取统计推送令牌")
+async def create_stream_token(current_user: User = Depends(get_current_user)):
+    """
+    获取建立统计推送连接用的短期令牌
+    EventSource 无法设置请求头，令牌只能放在 URL 中（会出现在访问日志里），
+    因此不使用登录令牌，而是签发只能用于 /stream、有效期很短的专用令牌
+    """
+    token = create_access_token(
+        {"sub": current_user.username, "user_id": current_user.id, "scope": STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+    return {"token": token, "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
+
+@router.get("/stream", summary="统计实时推送（SSE）")
+async def stream_statistics(
+    token: Optional[str] = Query(None, description="POST /stream-token 获取的推送令牌（EventSource 无法设置请求头）"),
+    authorization: Optional[str] = Header(None, description="Bearer token"),
+    db: Session = Depends(get_db)
+):
+    """
+    统计实时推送（Server-Sent Events）
+    - summary: 连接时以及其他来源的写入导致汇总变化时推送完整汇总（与无筛选的 /summary 一致）
+    - delta: 本用户记录新增/修改/删除后推送增量、更新后的汇总以及变更前后的记录，
+      客户端可据此判断当前筛选范围是否受影响，无需轮询
+    - 连接最长保持 SSE_MAX_SECONDS 秒，之后客户端重新获取推送令牌并重连
+    """
+    if authorization or not token:
+        current_user = await get_current_user(authorization, db)
+    else:
+        current_user = await authenticate_token(token, db, STREAM_TOKEN_SCOPE)
+    user_id = current_user.id
+    queue = await stats_stream.subscribe(user_id)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SSE_MAX_SECONDS
+        try:
+            yield b"retry: 3000\n\n"
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    yield await asyncio.wait_for(queue.get(), min(SSE_HEARTBEAT_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            stats_stream.unsubscribe(user_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # 关闭 nginx 的响应缓冲，事件立即到达客户端
+        "X-Accel-Buffering": "no",
+    })
@@ -54,6 +54,55 @@ class PaymentMethodUpdate(BaseModel):
     sort_order: Optional[int] = Field(None, ge=0)
 
 
+# ============ 批量操作 Schema ============
+
+class ReorderRequest(BaseModel):
+    """批量排序请求：按列表顺序重写 sort_order（从 1 开始），须列出全部同级项"""
+    ids: List[int] = Field(..., min_length=1, description="完整排序后的 ID 列表")
+
+
+class CategoryBulkUpdate(CategoryUpdate):
+    """批量更新分类"""
+    id: int
+
+
+class CategoryItemBulkUpdate(CategoryItemUpdate):
+    """
+    批量更新二级分类
+    不能修改 category_id（记录中的一级分类不会随之改变，也不校验目标分类），传入时返回 422
+    """
+    id: int
+
+    class Config:
+        extra = "forbid"
+
+
+class PaymentMethodBulkUpdate(PaymentMethodUpdate):
+    """批量更新支付方式"""
+    id: int
+
+
+class CategoryBulkRequest(BaseModel):
+    """分类批量操作请求"""
+    create: List[CategoryCreate] = []
+    update: List[CategoryBulkUpdate] = []
+    delete: List[int] = []
+
+
+class CategoryItemBulkRequest(BaseModel):
+    """二级分类批量操作请求"""
+    create: List[CategoryItemCreate] = []
+    update: List[CategoryItemBulkUpdate] = []
+    delete: List[int] = []
+
+
+class PaymentMethodBulkRequest(BaseModel):
+    """支付方式批量操作请求"""
+    create: List[PaymentMethodCreate] = []
+    update: List[PaymentMethodBulkUpdate] = []
+    delete: List[int] = []
+
+
 # ============ 响应 Schema ============
 
 class CategoryResponse(BaseModel):
@@ -105,6 +154,13 @@ class CategoriesListResponse(BaseModel):
     income: List[CategoryWithItemsResponse] = []
 
 
+class BulkResultResponse(BaseModel):
+    """批量操作结果"""
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+
 class MessageResponse(BaseModel):
     """通用消息响应"""
     message: str
@@ -0,0 +1,35 @@
+"""
+后台任务 Schema
+Pydantic 数据验证模型
+"""
+
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class JobResponse(BaseModel):
+    """后台任务状态"""
+    id: str
+    kind: str
+    status: str = Field(..., description="pending / running / succeeded / failed")
+    attempts: int
+    max_attempts: int
+    total: int
+    done: int
+    error: Optional[str] = None
+    run_after: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobListResponse(BaseModel):
+    """后台任务列表"""
+    jobs: List[JobResponse]
+    total: int
+    page: int
+    page_size: int
@@ -68,20 +68,83 @@ class ProjectResponse(BaseModel):
         from_attributes = True
 
 
+class ProjectBreakdownItem(BaseModel):
+    """项目汇总项（按分类/支付方式）"""
+    id: Optional[int]
+    name: Optional[str]
+    icon: Optional[str] = None
+    amount: Decimal
+    count: int
+
+
+class ProjectDailyItem(BaseModel):
+    """项目每日汇总"""
+    date: str
+    amount: Decimal
+    count: int
+
+
+class ProjectRecordPage(BaseModel):
+    """项目记录分页（游标）"""
+    records: List[ProjectRecordResponse] = []
+    next_cursor: Optional[str] = None
+
+
 class ProjectDetailResponse(ProjectResponse):
     """项目详情响应（包含关联信息）"""
     # 计算字段
     avg_expense: Decimal = Decimal('0')  # 人均费用
     expense_rate: float = 0.0  # 消费率
     
-    # 关联记录
+    # 汇总（SQL 分组计算）
+    record_count: int = 0
+    by_category: List[ProjectBreakdownItem] = []
+    by_payment_method: List[ProjectBreakdownItem] = []
+    by_day: List[ProjectDailyItem] = []
+    
+    # 关联记录（仅第一页，后续通过 /projects/{id}/records?cursor= 获取）
     records: List[ProjectRecordResponse] = []
+    next_cursor: Optional[str] = None
+
+
+class BurndownPoint(BaseModel):
+    """燃尽图数据点（每日）"""
+    date: date
+    spent: Decimal  # 当日消费
+    cumulative: Decimal  # 累计消费
+    budget_line: Decimal  # 线性预算线（截至当日的计划累计）
+
+
+class BurndownResponse(BaseModel):
+    """项目预算燃尽图"""
+    project_id: int
+    budget: Decimal
+    start_date: date
+    end_date: date
+    total_days: int
+    elapsed_days: int
+    spent: Decimal  # 累计消费
+    projected_spend: Decimal  # 按当前速度推算的结束时总消费
+    per_member_average: Decimal  # 人均消费
+    over_budget: bool  # 推算是否超预算
+    days: List[BurndownPoint] = []
+
+
+class ProjectListItemResponse(ProjectResponse):
+    """项目列表项（包含实时汇总）"""
+    record_count: int = 0
+    spent: Decimal = Decimal('0')  # 关联记录金额合计
+    remaining_budget: Decimal = Decimal('0')  # 剩余预算
+    per_member_spend: Decimal = Decimal('0')  # 人均消费
+    last_record_date: Optional[datetime] = None  # 最近一笔记录日期
 
 
 class ProjectListResponse(BaseModel):
     """项目列表响应"""
-    projects: List[ProjectResponse] = []
+    projects: List[ProjectListItemResponse] = []
     total: int = 0
+    page: Optional[int] = None
+    page_size: Optional[int] = None
 
 
 class MessageResponse(BaseModel):
@@ -84,6 +84,22 @@ class RecordListResponse(BaseModel):
     total_pages: int = 1
 
 
+class AdminRecordResponse(RecordDetailResponse):
+    """管理端记录响应（附带用户名）"""
+    username: Optional[str] = None
+
+
+class AdminRecordListResponse(BaseModel):
+    """管理端记录列表响应（键集分页）"""
+    records: List[AdminRecordResponse] = []
+    total: Optional[int] = None
+    total_is_estimate: bool = False  # total 为上限截断的估计值
+    page: int = 1
+    page_size: int = 20
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
 class RecordStatsResponse(BaseModel):
     """记账统计响应"""
     total_count: int = 0
@@ -4,8 +4,8 @@ Pydantic 数据验证模型
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime
 
 
 # ============ 请求 Schema ============
@@ -55,6 +55,33 @@ class UserDetailResponse(UserResponse):
     project_count: int = 0
 
 
+class UserDailyCount(BaseModel):
+    """某日新增记录数"""
+    date: date
+    count: int
+
+
+class UserUsageResponse(BaseModel):
+    """用户用量"""
+    user_id: int
+    username: str
+    is_active: bool
+    record_count: int = 0
+    project_count: int = 0
+    data_size: int = Field(0, description="估算数据量（字节）")
+    recent_records: int = Field(0, description="近 30 天新增记录数")
+    daily_records: List[UserDailyCount] = Field(default_factory=list, description="近 30 天每日新增记录数（仅含非零日）")
+    last_activity_at: Optional[datetime] = None
+
+
+class UserUsageListResponse(BaseModel):
+    """用户用量列表"""
+    users: List[UserUsageResponse]
+    total: int
+    page: int
+    page_size: int
+
+
 class InviteCodeCheck(BaseModel):
     """邀请码验证响应"""
     valid: bool
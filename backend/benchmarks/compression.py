@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应压缩基准测试
+在进程内驱动应用，按编码（identity / gzip / br / zstd，未安装的跳过）测量典型响应的
+传输字节数与延迟:
+  - 记录列表（page_size=100）
+  - 项目详情
+  - 分类树
+  - CSV 导出（流式）
+数据由 generate_data.py 生成
+
+用法:
+    python benchmarks/compression.py --db /tmp/bench.db
+    python benchmarks/compression.py --db /tmp/bench.db --repeat 50 --json result.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+# 添加后端路径
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="响应压缩基准测试")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "..", "data", "bench.db"),
+                        help="generate_data.py 生成的 SQLite 文件")
+    parser.add_argument("--username", default="bench_user_1", help="测试用户")
+    parser.add_argument("--password", default="benchpass", help="用户密码")
+    parser.add_argument("--repeat", type=int, default=20, help="每个用例的测量次数")
+    parser.add_argument("--export-repeat", type=int, default=3, help="导出用例的测量次数")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    return parser.parse_args()
+
+
+async def measure(client, path: str, headers: dict, encoding: str, repeat: int) -> dict:
+    """返回传输字节数、解压后字节数和延迟"""
+    request_headers = {**headers, "Accept-Encoding": encoding}
+    timings = []
+    wire = raw = 0
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        async with client.stream("GET", path, headers=request_headers) as response:
+            response.raise_for_status()
+            body = await response.aread()
+            elapsed = (time.perf_counter() - start) * 1000
+            wire, raw = response.num_bytes_downloaded, len(body)
+            used = response.headers.get("content-encoding", "identity")
+        if i:  # 第一次作为预热
+            timings.append(elapsed)
+    timings.sort()
+    return {
+        "encoding": used,
+        "wire_bytes": wire,
+        "raw_bytes": raw,
+        "ratio": round(wire / raw, 3) if raw else 1.0,
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+    }
+
+
+async def run(args) -> list:
+    from app.compression import COMPRESSORS
+    from app.main import app
+
+    encodings = ["identity"] + [e for e in ("gzip", "br", "zstd") if e in COMPRESSORS]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        token = (await client.post("/api/v1/auth/login", data={
+            "username": args.username, "password": args.password
+        })).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        projects = (await client.get("/api/v1/projects", headers=headers)).json()["projects"]
+
+        cases = [
+            ("records[page_size=100]", "/api/v1/records?page_size=100", args.repeat),
+            ("categories", "/api/v1/categories", args.repeat),
+            ("records/export", "/api/v1/records/export", args.export_repeat),
+        ]
+        if projects:
+            cases.insert(1, ("project detail", f"/api/v1/projects/{projects[0]['id']}", args.repeat))
+
+        results = []
+        print(f"{'用例':<24} {'编码':<9} {'传输字节':>12} {'原始字节':>12} {'比例':>7} {'p50 ms':>9} {'mean ms':>9}")
+        for name, path, repeat in cases:
+            for encoding in encodings:
+                result = {"case": name, **await measure(client, path, headers, encoding, repeat)}
+                results.append(result)
+                print(f"{name:<24} {result['encoding']:<9} {result['wire_bytes']:>12} {result['raw_bytes']:>12} "
+                      f"{result['ratio']:>7.3f} {result['p50_ms']:>9.3f} {result['mean_ms']:>9.3f}")
+        return results
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"数据库不存在: {args.db}，请先运行 generate_data.py")
+    os.environ["DB_PATH"] = os.path.abspath(args.db)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
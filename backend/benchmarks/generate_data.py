@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测数据生成
+按 init_categories.py 的默认分类生成逼真的账本数据，批量 INSERT 直接写入 SQLite:
+  - 用户 bench_user_1..N，密码统一为 --password
+  - 支出/收入按分类排序加权（排序靠前的分类更常用），金额按分类量级随机
+  - 每个用户若干项目，约 1/5 的支出关联到项目
+  - 记录日期和创建时间分布在最近 --days 天内
+计数器和活动汇总由触发器随插入维护
+
+用法:
+    python benchmarks/generate_data.py --db /tmp/bench.db --users 10 --records-per-user 10000
+    python benchmarks/generate_data.py --db /tmp/bench.db --users 100 --records-per-user 10000 --seed 7
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# 添加后端路径
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# 支出 / 收入的占比
+EXPENSE_RATIO = 0.85
+# 关联项目的支出占比
+PROJECT_RATIO = 0.2
+# 各分类的金额区间（元），未列出的使用默认区间
+AMOUNT_RANGES = {
+    "餐饮": (8, 120),
+    "交通": (2, 800),
+    "住房": (500, 6000),
+    "工资": (5000, 30000),
+}
+DEFAULT_AMOUNT_RANGE = (5, 500)
+REMARKS = [None, None, None, "午餐", "晚餐", "打车", "超市", "房租", "话费", "聚餐", "报销", "红包"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="生成压测数据")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "..", "data", "bench.db"),
+                        help="SQLite 文件路径（默认 data/bench.db）")
+    parser.add_argument("--users", type=int, default=10, help="用户数")
+    parser.add_argument("--records-per-user", type=int, default=1000, help="每个用户的记录数")
+    parser.add_argument("--projects-per-user", type=int, default=3, help="每个用户的项目数")
+    parser.add_argument("--days", type=int, default=365, help="记录分布的天数")
+    parser.add_argument("--password", default="benchpass", help="所有用户的密码")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="密码哈希代价因子（登录后按服务端配置自动升级）")
+    parser.add_argument("--batch", type=int, default=10000, help="每批插入的行数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    return parser.parse_args()
+
+
+def weighted(choices):
+    """按排序加权: 第 i 个的权重为 1/(i+1)"""
+    weights = [1 / (i + 1) for i in range(len(choices))]
+    return choices, weights
+
+
+def main():
+    args = parse_args()
+    os.environ["DB_PATH"] = os.path.abspath(args.db)
+
+    from sqlalchemy import insert, select, text
+    from app.database import engine, init_db
+    from app.models import User, Record, Project, Category, CategoryItem, PaymentMethod
+    from app.routers.auth import hash_password
+    from init_categories import seed
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    init_db()
+
+    with engine.begin() as conn:
+        seed(conn)
+
+    with engine.connect() as conn:
+        categories = conn.execute(
+            select(Category.id, Category.name, Category.type).order_by(Category.sort_order, Category.id)
+        ).all()
+        items = {}
+        for item_id, category_id in conn.execute(
+            select(CategoryItem.id, CategoryItem.category_id).order_by(CategoryItem.sort_order)
+        ):
+            items.setdefault(category_id, []).append(item_id)
+        payment_methods = conn.execute(select(PaymentMethod.id).order_by(PaymentMethod.sort_order)).scalars().all()
+        first_user = conn.execute(select(User.id).limit(1)).first()
+
+    expense = weighted([c for c in categories if c.type == "expense" and c.id in items])
+    income = weighted([c for c in categories if c.type == "income" and c.id in items])
+    pm_choices, pm_weights = weighted(payment_methods)
+    password_hash = hash_password(args.password, args.bcrypt_rounds)
+    now = datetime.utcnow()
+    today = now.date()
+
+    with engine.begin() as conn:
+        # 批量写入期间关闭同步刷盘
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+        prefix = "bench_user_"
+        existing = conn.execute(
+            select(User.username).where(User.username.like(f"{prefix}%"))
+        ).scalars().all()
+        start_index = len(existing) + 1
+        conn.execute(insert(User), [
+            {
+                "username": f"{prefix}{i}",
+                "password_hash": password_hash,
+                "is_admin": first_user is None and i == start_index,
+                "is_active": True,
+                "created_at": now - timedelta(days=args.days),
+            }
+            for i in range(start_index, start_index + args.users)
+        ])
+        user_ids = conn.execute(
+            select(User.id).where(User.username.like(f"{prefix}%")).order_by(User.id)
+        ).scalars().all()[-args.users:]
+
+        project_rows = []
+        for user_id in user_ids:
+            for n in range(args.projects_per_user):
+                start_date = today - timedelta(days=rng.randint(0, args.days))
+                project_rows.append({
+                    "user_id": user_id,
+                    "title": f"项目 {n + 1}",
+                    "start_date": start_date,
+                    "end_date": start_date + timedelta(days=rng.randint(3, 30)),
+                    "budget": Decimal(rng.randrange(1000, 50000, 500)),
+                    "member_count": rng.randint(1, 6),
+                    "total_expense": Decimal("0"),
+                    "status": "ongoing",
+                    "created_at": datetime.combine(start_date, datetime.min.time()),
+                })
+        if project_rows:
+            conn.execute(insert(Project), project_rows)
+        projects = {}
+        for project_id, user_id in conn.execute(
+            select(Project.id, Project.user_id).where(Project.user_id.in_(user_ids))
+        ):
+            projects.setdefault(user_id, []).append(project_id)
+
+        total = len(user_ids) * args.records_per_user
+        batch = []
+        written = 0
+        for user_id in user_ids:
+            user_projects = projects.get(user_id, [])
+            for _ in range(args.records_per_user):
+                is_expense = rng.random() < EXPENSE_RATIO
+                choices, weights = expense if is_expense else income
+                category = rng.choices(choices, weights)[0]
+                low, high = AMOUNT_RANGES.get(category.name, DEFAULT_AMOUNT_RANGE)
+                day = now - timedelta(days=rng.randint(0, args.days - 1), seconds=rng.randint(0, 86399))
+                batch.append({
+                    "user_id": user_id,
+                    "type": category.type,
+                    "category_id": category.id,
+                    "category_item_id": rng.choice(items[category.id]),
+                    "amount": Decimal(rng.randint(low * 100, high * 100)) / 100,
+                    "date": day.replace(hour=0, minute=0, second=0, microsecond=0),
+                    "remark": rng.choice(REMARKS),
+                    "payment_method_id": rng.choices(pm_choices, pm_weights)[0] if pm_choices else None,
+                    "project_id": (
+                        rng.choice(user_projects)
+                        if is_expense and user_projects and rng.random() < PROJECT_RATIO else None
+                    ),
+                    "created_at": day,
+                    "updated_at": day,
+                })
+                if len(batch) >= args.batch:
+                    conn.execute(insert(Record), batch)
+                    written += len(batch)
+                    batch = []
+                    print(f"\r  记录 {written}/{total}", end="", flush=True)
+        if batch:
+            conn.execute(insert(Record), batch)
+            written += len(batch)
+        print(f"\r  记录 {written}/{total}")
+
+        # 项目总支出与记录保持一致
+        conn.execute(text("""
+            UPDATE projects SET total_expense = COALESCE(
+                (SELECT SUM(amount) FROM records
+                 WHERE records.project_id = projects.id AND records.type = 'expense'), 0)
+            WHERE user_id IN (SELECT value FROM json_each(:ids))
+        """), {"ids": str(user_ids)})
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ 已生成 {len(user_ids)} 个用户, {len(user_ids) * args.projects_per_user} 个项目, "
+          f"{written} 条记录 -> {os.environ['DB_PATH']} ({elapsed:.1f}s, {written / elapsed:.0f} 行/秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端压测
+以混合读写负载并发请求 API，按路由统计吞吐量和 p50/p95/p99 延迟:
+  - 默认在进程内通过 httpx.ASGITransport 驱动 FastAPI 应用（--db 指定数据库）
+  - 指定 --url 时请求已启动的 uvicorn 服务
+用户由 generate_data.py 生成（bench_user_1..N）
+
+用法:
+    python benchmarks/load_test.py --db /tmp/bench.db --duration 30 --concurrency 20
+    python benchmarks/load_test.py --url http://127.0.0.1:888 --requests 5000 --json result.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import httpx
+
+# 添加后端路径
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# 负载组成: (路由, 权重)，路由同时作为统计的键
+WORKLOAD = [
+    ("GET /api/v1/records", 30),
+    ("GET /api/v1/records/stats/summary", 8),
+    ("GET /api/v1/statistics/summary", 8),
+    ("GET /api/v1/statistics/by-category", 8),
+    ("GET /api/v1/statistics/by-day", 4),
+    ("GET /api/v1/statistics/by-project", 4),
+    ("GET /api/v1/statistics/trend", 4),
+    ("GET /api/v1/projects", 8),
+    ("GET /api/v1/projects/{id}", 6),
+    ("GET /api/v1/categories", 5),
+    ("POST /api/v1/records", 10),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="端到端压测")
+    parser.add_argument("--url", help="服务地址，不指定时在进程内驱动应用")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "..", "data", "bench.db"),
+                        help="进程内模式使用的 SQLite 文件")
+    parser.add_argument("--users", type=int, default=10, help="参与压测的用户数")
+    parser.add_argument("--password", default="benchpass", help="用户密码")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发数")
+    parser.add_argument("--duration", type=float, default=10, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, default=0, help="总请求数，指定时忽略 --duration")
+    parser.add_argument("--read-only", action="store_true", help="不发送写请求")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    return parser.parse_args()
+
+
+class Session:
+    """一个已登录用户及其可用的项目和分类"""
+
+    def __init__(self, headers, projects, categories):
+        self.headers = headers
+        self.projects = projects
+        self.categories = categories
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def build_request(route: str, session: Session, rng: random.Random):
+    """根据路由生成 (method, path, kwargs)"""
+    method, path = route.split(" ", 1)
+    kwargs = {"headers": session.headers}
+    if route == "GET /api/v1/records":
+        kwargs["params"] = {"page": rng.randint(1, 5), "page_size": 20}
+    elif route == "GET /api/v1/statistics/by-day":
+        end = date.today()
+        kwargs["params"] = {"start_date": str(end - timedelta(days=30)), "end_date": str(end)}
+    elif route == "GET /api/v1/projects/{id}":
+        path = path.replace("{id}", str(rng.choice(session.projects)))
+    elif route == "POST /api/v1/records":
+        category = rng.choice(session.categories)
+        kwargs["json"] = {
+            "type": category["type"],
+            "category_id": category["id"],
+            "category_item_id": rng.choice(category["items"])["id"],
+            "amount": f"{rng.randint(100, 50000) / 100:.2f}",
+            "date": str(date.today() - timedelta(days=rng.randint(0, 30))),
+            "remark": "压测",
+        }
+    return method, path, kwargs
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> Session:
+    r = await client.post("/api/v1/auth/login", data={"username": username, "password": password})
+    r.raise_for_status()
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    projects = [p["id"] for p in (await client.get("/api/v1/projects", headers=headers)).json()["projects"]]
+    tree = (await client.get("/api/v1/categories", headers=headers)).json()
+    categories = [
+        {"id": c["id"], "type": c["type"], "items": c["items"]}
+        for c in tree.get("expense", []) + tree.get("income", []) if c["items"]
+    ]
+    return Session(headers, projects, categories)
+
+
+async def run(args, client: httpx.AsyncClient) -> dict:
+    rng = random.Random(args.seed)
+    sessions = [
+        await login(client, f"bench_user_{i}", args.password)
+        for i in range(1, args.users + 1)
+    ]
+
+    workload = [(route, weight) for route, weight in WORKLOAD if not (args.read_only and route.startswith("POST"))]
+    routes = [route for route, _ in workload]
+    weights = [weight for _, weight in workload]
+    latencies = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests]
+
+    async def worker(worker_id: int):
+        worker_rng = random.Random(rng.random())
+        while True:
+            if args.requests:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            elif time.perf_counter() >= deadline:
+                return
+
+            session = worker_rng.choice(sessions)
+            route = worker_rng.choices(routes, weights)[0]
+            if route == "GET /api/v1/projects/{id}" and not session.projects:
+                route = "GET /api/v1/projects"
+            method, path, kwargs = build_request(route, session, worker_rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies[route].append(time.perf_counter() - start)
+            if not ok:
+                errors[route] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for route in routes:
+        values = sorted(latencies[route])
+        if not values:
+            continue
+        results[route] = {
+            "requests": len(values),
+            "errors": errors[route],
+            "rps": round(len(values) / elapsed, 1),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        }
+    total = sum(r["requests"] for r in results.values())
+    all_values = sorted(v for values in latencies.values() for v in values)
+    return {
+        "mode": args.url or "asgi",
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "total": {
+            "requests": total,
+            "errors": sum(r["errors"] for r in results.values()),
+            "rps": round(total / elapsed, 1),
+            "p50_ms": round(percentile(all_values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(all_values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(all_values, 0.99) * 1000, 2),
+        },
+        "routes": results,
+    }
+
+
+def print_report(report: dict):
+    print(f"\n模式: {report['mode']}  并发: {report['concurrency']}  耗时: {report['elapsed_s']}s")
+    print(f"{'路由':<40} {'请求':>7} {'错误':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    rows = sorted(report["routes"].items()) + [("总计", report["total"])]
+    for route, r in rows:
+        print(f"{route:<40} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+
+
+async def main():
+    args = parse_args()
+    timeout = httpx.Timeout(30.0)
+    if args.url:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            report = await run(args, client)
+    else:
+        os.environ["DB_PATH"] = os.path.abspath(args.db)
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+            report = await run(args, client)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多 worker 缓存一致性检查
+在同一个 SQLite 文件上启动两个独立的 uvicorn 进程（相当于两个 worker，但可以分别寻址），
+先让 B 缓存数据，再通过 A 写入，验证 B 的下一次读取立即看到 A 的写入:
+  - 参考数据: A 新增分类 -> B 的分类树
+  - 项目燃尽图: A 新增项目记录 -> B 的 burndown
+  - 记录校验: A 新增二级分类 -> B 创建记录时的分类校验
+
+用法:
+    python benchmarks/multiworker_check.py
+    python benchmarks/multiworker_check.py --keep   # 保留临时数据库
+退出码 0 表示全部通过
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path: str, port: int) -> subprocess.Popen:
+    env = {**os.environ, "DB_PATH": db_path, "LOG_LEVEL": "WARNING", "BCRYPT_ROUNDS": "4"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def wait_ready(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} 未能启动")
+
+
+def check(name: str, ok: bool, failures: list):
+    print(f"  {'✅' if ok else '❌'} {name}")
+    if not ok:
+        failures.append(name)
+
+
+def run(url_a: str, url_b: str) -> list:
+    failures = []
+    a = httpx.Client(base_url=url_a)
+    b = httpx.Client(base_url=url_b)
+    token = a.post("/api/v1/auth/login", data={"username": "bench_user_1", "password": "benchpass"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    # 参考数据
+    b.get("/api/v1/categories", headers=headers)
+    b.get("/api/v1/categories", headers=headers)
+    created = a.post("/api/v1/categories", headers=headers, json={"name": "一致性检查", "type": "expense"})
+    created.raise_for_status()
+    category_id = created.json()["id"]
+    tree = b.get("/api/v1/categories", headers=headers).json()
+    check("A 新增的分类立即出现在 B 的分类树中",
+          any(c["id"] == category_id for c in tree["expense"]), failures)
+
+    # 记录校验（B 的参考数据缓存）
+    item = a.post("/api/v1/categories/items", headers=headers, json={"category_id": category_id, "name": "检查项"})
+    item.raise_for_status()
+    record = {
+        "type": "expense", "category_id": category_id, "category_item_id": item.json()["id"],
+        "amount": "10.00", "date": str(date.today()),
+    }
+    check("B 使用 A 新增的二级分类创建记录",
+          b.post("/api/v1/records", headers=headers, json=record).status_code == 200, failures)
+
+    # 项目燃尽图
+    project = a.post("/api/v1/projects", headers=headers, json={
+        "title": "一致性检查", "start_date": str(date.today()), "end_date": str(date.today()),
+        "budget": "100", "member_count": 1,
+    }).json()
+    before = b.get(f"/api/v1/projects/{project['id']}/burndown", headers=headers).json()
+    b.get(f"/api/v1/projects/{project['id']}/burndown", headers=headers)
+    a.post("/api/v1/records", headers=headers, json={**record, "amount": "25.00", "project_id": project["id"]})
+    after = b.get(f"/api/v1/projects/{project['id']}/burndown", headers=headers).json()
+    check("A 新增的项目记录立即反映在 B 缓存的燃尽图中",
+          before["spent"] == "0.00" and after["spent"] == "25.00", failures)
+
+    # 删除后恢复
+    a.delete(f"/api/v1/categories/{category_id}", headers=headers)
+    tree = b.get("/api/v1/categories", headers=headers).json()
+    check("A 删除的分类立即从 B 的分类树中消失",
+          all(c["id"] != category_id for c in tree["expense"]), failures)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多 worker 缓存一致性检查")
+    parser.add_argument("--keep", action="store_true", help="保留临时数据库")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="myledger-mw-")
+    db_path = os.path.join(workdir, "check.db")
+    subprocess.run([
+        sys.executable, os.path.join(BENCH_DIR, "generate_data.py"),
+        "--db", db_path, "--users", "1", "--records-per-user", "100",
+    ], check=True, stdout=subprocess.DEVNULL)
+
+    port_a, port_b = free_port(), free_port()
+    servers = [start_server(db_path, port_a), start_server(db_path, port_b)]
+    try:
+        url_a, url_b = f"http://127.0.0.1:{port_a}", f"http://127.0.0.1:{port_b}"
+        wait_ready(url_a)
+        wait_ready(url_b)
+        print(f"worker A {url_a}, worker B {url_b}, 数据库 {db_path}")
+        failures = run(url_a, url_b)
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait()
+        if not args.keep:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
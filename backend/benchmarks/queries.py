@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询基准测试
+直接调用处理函数（不经过 HTTP），测量统计与记录查询在不同数据量、不同引擎配置下的耗时:
+  - statistics: summary / by-category / by-day / by-project / trend
+  - records.get_records / records.get_stats_summary
+  - projects.get_project
+数据由 generate_data.py 生成并按数据量缓存在 --data-dir 中，
+每个 (数据量, 引擎配置) 在独立子进程中运行，结果写入 JSON，可与之前的结果对比
+
+用法:
+    python benchmarks/queries.py --sizes 10000,100000 --output results/queries.json
+    python benchmarks/queries.py --sizes 10000,100000,1000000 --profiles app,tuned
+    python benchmarks/queries.py --sizes 10000 --compare results/queries.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# 添加后端路径
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+# 引擎配置: 名称 -> 在 database.py 的连接设置之后额外执行的 PRAGMA
+# app: 只有 database.py 的设置（WAL、synchronous=NORMAL、busy_timeout、auto_vacuum），即实际部署的配置
+PROFILES = {
+    "app": [],
+    "tuned": [
+        "PRAGMA cache_size=-65536",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA temp_store=MEMORY",
+    ],
+}
+
+# 对比时超过该比例的变化标记为回归/提升
+CHANGE_THRESHOLD = 0.10
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="查询基准测试")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="记录总数，逗号分隔")
+    parser.add_argument("--profiles", default="app", help=f"引擎配置，逗号分隔: {', '.join(PROFILES)}")
+    parser.add_argument("--users", type=int, default=10, help="记录平均分给多少个用户")
+    parser.add_argument("--data-dir", default=os.path.join(BACKEND_DIR, "..", "data", "bench"),
+                        help="生成的数据库缓存目录")
+    parser.add_argument("--repeat", type=int, default=20, help="每个用例的测量次数")
+    parser.add_argument("--warmup", type=int, default=3, help="每个用例的预热次数")
+    parser.add_argument("--output", help="结果 JSON 文件（默认 benchmarks/results/queries-<commit>.json）")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    # 子进程内部参数
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--profile", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_worker(args):
+    """在子进程中针对一个数据库和引擎配置运行全部用例，结果以 JSON 输出到 stdout"""
+    os.environ["DB_PATH"] = os.path.abspath(args.db)
+
+    from sqlalchemy import event, func
+    from app.database import engine, SessionLocal
+    from app.models import User, Record, Project
+    from app.profiler import assert_max_queries
+    from app.routers import statistics as stats_router, records, projects
+    from app.warmup import call_handler
+
+    pragmas = PROFILES[args.profile]
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == "bench_user_1").one()
+    project_id = db.query(Record.project_id).filter(
+        Record.user_id == user.id, Record.project_id.isnot(None)
+    ).group_by(Record.project_id).order_by(func.count().desc()).limit(1).scalar()
+    user_records = db.query(func.count(Record.id)).filter(Record.user_id == user.id).scalar()
+    today = date.today()
+    month_ago = str(today - timedelta(days=30))
+
+    cases = [
+        ("statistics.get_summary", stats_router.get_summary, {}),
+        ("statistics.get_summary[30d]", stats_router.get_summary, {"start_date": month_ago}),
+        ("statistics.get_by_category", stats_router.get_by_category, {}),
+        ("statistics.get_by_category[expense]", stats_router.get_by_category, {"record_type": "expense"}),
+        ("statistics.get_by_day[30d]", stats_router.get_by_day, {"start_date": month_ago, "end_date": str(today)}),
+        ("statistics.get_by_project", stats_router.get_by_project, {}),
+        ("statistics.get_trend[month]", stats_router.get_trend, {"period": "month"}),
+        ("statistics.get_trend[day]", stats_router.get_trend, {"period": "day"}),
+        ("records.get_records", records.get_records, {}),
+        ("records.get_records[page 50]", records.get_records, {"page": 50}),
+        ("records.get_records[expense]", records.get_records, {"type": "expense"}),
+        ("records.get_stats_summary", records.get_stats_summary, {}),
+        ("projects.get_project", projects.get_project, {"project_id": project_id}),
+    ]
+
+    loop = asyncio.new_event_loop()
+    results = []
+    for name, handler, kwargs in cases:
+        if "project_id" in kwargs and kwargs["project_id"] is None:
+            continue
+
+        def call():
+            return loop.run_until_complete(call_handler(handler, current_user=user, db=db, **kwargs))
+
+        for _ in range(args.warmup):
+            call()
+        with assert_max_queries(10 ** 9, engine) as profile:
+            call()
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results.append({
+            "case": name,
+            "queries": profile.count,
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "p50_ms": round(timings[len(timings) // 2], 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            "min_ms": round(timings[0], 3),
+        })
+    db.close()
+    loop.close()
+    print(json.dumps({"user_records": user_records, "cases": results}, ensure_ascii=False))
+
+
+def ensure_database(data_dir: str, size: int, users: int) -> str:
+    """生成（或复用）指定数据量的数据库"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"bench_{size}.db")
+    if not os.path.exists(path):
+        print(f"生成 {size} 条记录 -> {path}", file=sys.stderr)
+        subprocess.run([
+            sys.executable, os.path.join(BENCH_DIR, "generate_data.py"),
+            "--db", path, "--users", str(users), "--records-per-user", str(max(1, size // users)),
+        ], check=True, stdout=sys.stderr)
+    return path
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: list, baseline_path: str):
+    """按 (数据量, 引擎配置, 用例) 对比 p50"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["size"], r["profile"], r["case"]): r for r in baseline["results"]}
+    print(f"\n与 {baseline_path} ({baseline.get('commit')}) 对比 p50:")
+    for r in results:
+        before = old.get((r["size"], r["profile"], r["case"]))
+        if not before or not before["p50_ms"]:
+            continue
+        change = r["p50_ms"] / before["p50_ms"] - 1
+        mark = "回归" if change > CHANGE_THRESHOLD else "提升" if change < -CHANGE_THRESHOLD else ""
+        print(f"  {r['size']:>8} {r['profile']:<8} {r['case']:<40} "
+              f"{before['p50_ms']:>9.3f} -> {r['p50_ms']:>9.3f} ms {change:+7.1%} {mark}")
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        run_worker(args)
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    profiles = [p for p in args.profiles.split(",") if p]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        sys.exit(f"未知的引擎配置: {', '.join(sorted(unknown))}")
+
+    results = []
+    for size in sizes:
+        path = ensure_database(args.data_dir, size, args.users)
+        for profile in profiles:
+            output = subprocess.run([
+                sys.executable, os.path.abspath(__file__), "--worker",
+                "--db", path, "--profile", profile,
+                "--repeat", str(args.repeat), "--warmup", str(args.warmup),
+            ], check=True, capture_output=True, text=True).stdout
+            report = json.loads(output.strip().splitlines()[-1])
+            print(f"\n数据量 {size}（测试用户 {report['user_records']} 条）引擎配置 {profile}")
+            print(f"  {'用例':<40} {'语句':>4} {'mean':>9} {'p50':>9} {'p95':>9}")
+            for case in report["cases"]:
+                print(f"  {case['case']:<40} {case['queries']:>4} {case['mean_ms']:>9.3f} "
+                      f"{case['p50_ms']:>9.3f} {case['p95_ms']:>9.3f}")
+                results.append({"size": size, "profile": profile, "user_records": report["user_records"], **case})
+
+    commit = git_commit()
+    document = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output_path = args.output or os.path.join(BENCH_DIR, "results", f"queries-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {output_path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
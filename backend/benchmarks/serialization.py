@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+序列化基准测试
+对比热点接口两条响应路径的 CPU 耗时（不含数据库查询）:
+  - default: response_model 校验 + FastAPI serialize_response + 标准库 json
+  - fast:    直接构建 dict + orjson（FastJSONResponse）
+
+用法:
+    python benchmarks/serialization.py [--rows 100] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# 添加后端路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models import Record, Project
+from app.schemas.record import RecordListResponse
+from app.schemas.project import ProjectListResponse
+from app.responses import FastJSONResponse
+from app.routers.records import record_detail
+from app.routers.projects import project_summary
+
+
+def make_records(rows: int):
+    """构造内存中的记录对象（不写数据库）"""
+    now = datetime(2026, 1, 1, 12, 30, 15, 123456)
+    return [
+        Record(
+            id=i, user_id=1, type='expense' if i % 5 else 'income',
+            category_id=i % 10 + 1, category_item_id=i % 40 + 1,
+            amount=Decimal(f"{i % 500}.{i % 100:02d}"),
+            date=now - timedelta(days=i), remark=f"备注 {i} 午餐外卖",
+            payment_method_id=i % 6 + 1, project_id=None,
+            created_at=now, updated_at=now,
+        )
+        for i in range(1, rows + 1)
+    ]
+
+
+def make_projects(rows: int):
+    now = datetime(2026, 1, 1, 12, 30, 15, 123456)
+    return [
+        Project(
+            id=i, user_id=1, title=f"项目 {i}", start_date=date(2026, 1, 1),
+            end_date=date(2026, 1, 10), budget=Decimal("5000.00"), member_count=3,
+            total_expense=Decimal("1234.50"), status="ongoing", description="出差",
+            created_at=now, updated_at=now,
+        )
+        for i in range(1, rows + 1)
+    ]
+
+
+def render_default(model, content) -> bytes:
+    """FastAPI 默认路径: 校验 -> 序列化 -> json.dumps"""
+    field = create_model_field(name="response", type_=model)
+    data = asyncio.run(serialize_response(field=field, response_content=content))
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def bench(fn, repeat: int) -> float:
+    """返回单次调用耗时中位数（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="序列化基准测试")
+    parser.add_argument("--rows", type=int, default=100, help="每页行数")
+    parser.add_argument("--repeat", type=int, default=200, help="重复次数")
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    projects = make_projects(args.rows)
+
+    def records_default():
+        # 与原实现一致：先构建 Pydantic 对象，再由 response_model 重新校验
+        from app.schemas.record import RecordDetailResponse
+        items = [RecordDetailResponse(**record_detail(r)) for r in records]
+        page = {"records": items, "total": 1000, "page": 1, "page_size": args.rows, "total_pages": 10}
+        return render_default(RecordListResponse, page)
+
+    def records_fast():
+        page = {"records": [record_detail(r) for r in records], "total": 1000,
+                "page": 1, "page_size": args.rows, "total_pages": 10}
+        return FastJSONResponse(page).body
+
+    def project_item(p):
+        # 与 GET /projects 相同：项目字段 + 分组汇总字段
+        return dict(project_summary(p), record_count=12, spent=Decimal("1234.50"),
+                    remaining_budget=Decimal("3765.50"), per_member_spend=Decimal("411.50"),
+                    last_record_date=p.updated_at)
+
+    def projects_default():
+        return render_default(ProjectListResponse, {"projects": [project_item(p) for p in projects],
+                                                    "total": len(projects)})
+
+    def projects_fast():
+        return FastJSONResponse({"projects": [project_item(p) for p in projects],
+                                 "total": len(projects), "page": None, "page_size": None}).body
+
+    # 参考数据缓存在此不访问数据库
+    from app.cache import reference_cache, ReferenceData
+    reference_cache._data = ReferenceData({}, {}, {})
+
+    cases = [
+        ("GET /api/v1/records", records_default, records_fast),
+        ("GET /api/v1/admin/records", records_default, records_fast),
+        ("GET /api/v1/projects", projects_default, projects_fast),
+    ]
+
+    print(f"rows={args.rows} repeat={args.repeat} (中位数, ms)")
+    print(f"{'endpoint':<28}{'default':>10}{'fast':>10}{'speedup':>10}{'bytes':>10}")
+    for name, default_fn, fast_fn in cases:
+        assert json.loads(default_fn()) == json.loads(fast_fn()), f"{name}: 输出不一致"
+        t_default = bench(default_fn, args.repeat)
+        t_fast = bench(fast_fn, args.repeat)
+        print(f"{name:<28}{t_default:>10.3f}{t_fast:>10.3f}{t_default / t_fast:>9.1f}x{len(fast_fn()):>10}")
+
+
+if __name__ == "__main__":
+    main()
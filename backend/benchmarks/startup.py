@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动测量
+多次启动独立的 uvicorn 进程，测量从进程启动到 /health 返回 200 的时间、
+首个业务请求的延迟，以及应用记录的各启动阶段耗时（/metrics 中的 myledger_startup_seconds）；
+--importtime 额外输出 python -X importtime 中自身耗时最高的模块
+
+用法:
+    python benchmarks/startup.py --db /tmp/bench.db
+    python benchmarks/startup.py --db /tmp/bench.db --runs 5 --importtime
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="冷启动测量")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "..", "data", "bench.db"),
+                        help="generate_data.py 生成的 SQLite 文件")
+    parser.add_argument("--username", default="bench_user_1", help="首个业务请求使用的用户")
+    parser.add_argument("--password", default="benchpass", help="用户密码")
+    parser.add_argument("--runs", type=int, default=3, help="启动次数")
+    parser.add_argument("--importtime", action="store_true", help="输出导入耗时最高的模块")
+    parser.add_argument("--top", type=int, default=15, help="--importtime 输出的模块数")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_run(args, env: dict) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(f"{url}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if server.poll() is not None or time.perf_counter() - start > 60:
+                raise RuntimeError("服务未能启动")
+            time.sleep(0.01)
+        ready = time.perf_counter() - start
+
+        token = httpx.post(f"{url}/api/v1/auth/login", data={
+            "username": args.username, "password": args.password
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies = []
+        for _ in range(2):
+            t = time.perf_counter()
+            httpx.get(f"{url}/api/v1/records", headers=headers).raise_for_status()
+            latencies.append((time.perf_counter() - t) * 1000)
+
+        phases = {}
+        response = httpx.get(f"{url}/metrics")
+        if response.status_code == 200:
+            for name, value in re.findall(r'myledger_startup_seconds\{phase="(\w+)"\} ([\d.e-]+)', response.text):
+                phases[name] = float(value) * 1000
+        return {"ready_ms": ready * 1000, "first_ms": latencies[0], "second_ms": latencies[1], "phases": phases}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def print_importtime(env: dict, top: int):
+    """python -X importtime 按模块自身耗时排序"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in output.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), match.group(4)))
+    print(f"\n导入耗时（自身耗时前 {top}）:")
+    print(f"  {'模块':<48} {'自身 ms':>9} {'累计 ms':>9}")
+    for self_us, total_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {name:<48} {self_us / 1000:>9.1f} {total_us / 1000:>9.1f}")
+    app_main = next((r for r in rows if r[2] == "app.main"), None)
+    if app_main:
+        print(f"  import app.main 合计 {app_main[1] / 1000:.1f} ms")
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"数据库不存在: {args.db}，请先运行 generate_data.py")
+    env = {**os.environ, "DB_PATH": os.path.abspath(args.db), "LOG_LEVEL": "WARNING"}
+
+    runs = [measure_run(args, env) for _ in range(args.runs)]
+    print(f"{'次数':<6} {'就绪 ms':>9} {'首个请求 ms':>12} {'第二个请求 ms':>14}  启动阶段")
+    for i, run in enumerate(runs, 1):
+        phases = ", ".join(f"{name} {ms:.1f}" for name, ms in run["phases"].items())
+        print(f"{i:<6} {run['ready_ms']:>9.1f} {run['first_ms']:>12.2f} {run['second_ms']:>14.2f}  {phases}")
+    print(f"就绪中位数 {statistics.median(r['ready_ms'] for r in runs):.1f} ms")
+
+    if args.importtime:
+        print_importtime(env, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,28 @@
 """
 分类初始化脚本
 创建默认分类和支付方式数据
+
+以 INSERT ... ON CONFLICT 批量 upsert，单事务完成，可在已有数据的库上重复执行:
+  - 一级分类、支付方式按 name 去重，二级分类按 (category_id, name) 去重
+  - 默认只补充缺失的数据，不覆盖管理员的修改；--reset 时恢复默认图标和排序
+
+用法:
+    python init_categories.py            # 初始化
+    python init_categories.py --dry-run  # 只显示将要发生的变化，不写入数据库（也不建表）
+    python init_categories.py --reset    # 同时恢复默认图标和排序
 """
 
+import argparse
 import sys
 import os
+import time
 
 # 添加后端路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy.orm import Session
-from app.database import engine, SessionLocal, init_db
+from sqlalchemy import inspect, select, func
+from sqlalchemy.dialects.sqlite import insert
+from app.database import DB_PATH, engine, init_db
 from app.models import Category, CategoryItem, PaymentMethod
 
 
@@ -114,149 +126,171 @@ PAYMENT_METHODS = [
 ]
 
 
-def seed_categories(db: Session):
-    """插入分类数据"""
-    total_items = 0
+def default_categories():
+    """默认一级分类 [(name, type, icon, sort_order, items)]"""
+    return (
+        [(name, 'expense', icon, order, items) for name, icon, order, items in EXPENSE_CATEGORIES]
+        + [(name, 'income', icon, order, items) for name, icon, order, items in INCOME_CATEGORIES]
+    )
+
+
+def upsert(table, conflict_keys, update_columns, reset: bool):
+    """构建 INSERT ... ON CONFLICT 语句"""
+    stmt = insert(table)
+    if reset:
+        return stmt.on_conflict_do_update(
+            index_elements=conflict_keys,
+            set_={col: stmt.excluded[col] for col in update_columns}
+        )
+    return stmt.on_conflict_do_nothing(index_elements=conflict_keys)
+
+
+def diff(conn, reset: bool) -> dict:
+    """对比默认数据与数据库现状，返回将要新增/更新的行"""
+    categories = {
+        r.name: r for r in conn.execute(
+            select(Category.id, Category.name, Category.icon, Category.sort_order)
+        )
+    }
+    items = {
+        (r.category_id, r.name): r for r in conn.execute(
+            select(CategoryItem.category_id, CategoryItem.name, CategoryItem.sort_order)
+        )
+    }
+    payment_methods = {
+        r.name: r for r in conn.execute(
+            select(PaymentMethod.name, PaymentMethod.icon, PaymentMethod.sort_order)
+        )
+    }
     
-    # 支出分类
-    for name, icon, sort_order, items in EXPENSE_CATEGORIES:
-        category = db.query(Category).filter(
-            Category.name == name,
-            Category.type == 'expense'
-        ).first()
-        
-        if not category:
-            category = Category(
-                name=name,
-                type='expense',
-                icon=icon,
-                sort_order=sort_order
-            )
-            db.add(category)
-            db.flush()
-        
-        # 二级分类
-        for item_name, item_order in items:
-            existing = db.query(CategoryItem).filter(
-                CategoryItem.category_id == category.id,
-                CategoryItem.name == item_name
-            ).first()
-            
-            if not existing:
-                db_item = CategoryItem(
-                    category_id=category.id,
-                    name=item_name,
-                    sort_order=item_order
-                )
-                db.add(db_item)
-                total_items += 1
+    changes = {"categories": [], "items": [], "payment_methods": []}
     
-    # 收入分类
-    for name, icon, sort_order, items in INCOME_CATEGORIES:
-        category = db.query(Category).filter(
-            Category.name == name,
-            Category.type == 'income'
-        ).first()
-        
-        if not category:
-            category = Category(
-                name=name,
-                type='income',
-                icon=icon,
-                sort_order=sort_order
-            )
-            db.add(category)
-            db.flush()
+    for name, type_, icon, sort_order, category_items in default_categories():
+        existing = categories.get(name)
+        if existing is None:
+            changes["categories"].append(("+", name))
+        elif reset and (existing.icon, existing.sort_order) != (icon, sort_order):
+            changes["categories"].append(("~", name))
         
-        # 二级分类
-        for item_name, item_order in items:
-            existing = db.query(CategoryItem).filter(
-                CategoryItem.category_id == category.id,
-                CategoryItem.name == item_name
-            ).first()
-            
-            if not existing:
-                db_item = CategoryItem(
-                    category_id=category.id,
-                    name=item_name,
-                    sort_order=item_order
-                )
-                db.add(db_item)
-                total_items += 1
+        for item_name, item_order in category_items:
+            current = items.get((existing.id, item_name)) if existing else None
+            if current is None:
+                changes["items"].append(("+", f"{name}/{item_name}"))
+            elif reset and current.sort_order != item_order:
+                changes["items"].append(("~", f"{name}/{item_name}"))
+    
+    for name, icon, sort_order in PAYMENT_METHODS:
+        existing = payment_methods.get(name)
+        if existing is None:
+            changes["payment_methods"].append(("+", name))
+        elif reset and (existing.icon, existing.sort_order) != (icon, sort_order):
+            changes["payment_methods"].append(("~", name))
     
-    return total_items
+    return changes
 
 
-def seed_payment_methods(db: Session):
-    """插入支付方式数据"""
-    count = 0
+def seed(conn, reset: bool = False):
+    """批量 upsert 默认分类、二级分类和支付方式（在调用方的事务中执行）"""
+    defaults = default_categories()
     
-    for name, icon, sort_order in PAYMENT_METHODS:
-        existing = db.query(PaymentMethod).filter(PaymentMethod.name == name).first()
-        
-        if not existing:
-            pm = PaymentMethod(
-                name=name,
-                icon=icon,
-                sort_order=sort_order
-            )
-            db.add(pm)
-            count += 1
+    # 一级分类
+    conn.execute(
+        upsert(Category.__table__, ["name"], ["icon", "sort_order"], reset),
+        [
+            {"name": name, "type": type_, "icon": icon, "sort_order": sort_order}
+            for name, type_, icon, sort_order, _ in defaults
+        ]
+    )
+    
+    # 二级分类需要一级分类 ID
+    category_ids = dict(conn.execute(
+        select(Category.name, Category.id).where(Category.name.in_([d[0] for d in defaults]))
+    ).all())
+    conn.execute(
+        upsert(CategoryItem.__table__, ["category_id", "name"], ["sort_order"], reset),
+        [
+            {"category_id": category_ids[name], "name": item_name, "sort_order": item_order}
+            for name, _, _, _, category_items in defaults
+            for item_name, item_order in category_items
+        ]
+    )
     
-    return count
+    # 支付方式
+    conn.execute(
+        upsert(PaymentMethod.__table__, ["name"], ["icon", "sort_order"], reset),
+        [
+            {"name": name, "icon": icon, "sort_order": sort_order}
+            for name, icon, sort_order in PAYMENT_METHODS
+        ]
+    )
+
+
+def print_changes(changes: dict):
+    """打印差异"""
+    labels = {"categories": "📂 一级分类", "items": "📝 二级分类", "payment_methods": "💳 支付方式"}
+    for key, label in labels.items():
+        rows = changes[key]
+        print(f"  {label}: 新增 {sum(1 for op, _ in rows if op == '+')} 个, "
+              f"更新 {sum(1 for op, _ in rows if op == '~')} 个")
+        for op, name in rows:
+            print(f"    {op} {name}")
 
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="初始化默认分类和支付方式")
+    parser.add_argument("--dry-run", action="store_true", help="只显示差异，不写入数据库")
+    parser.add_argument("--reset", action="store_true", help="恢复默认分类的图标和排序")
+    args = parser.parse_args()
+    
     print("=" * 50)
-    print("  MyLedger - 分类数据初始化")
+    print("  MyLedger - 分类数据初始化" + (" (dry-run)" if args.dry_run else ""))
     print("=" * 50)
     print()
     
-    # 初始化数据库表
-    print("📊 正在创建数据库表...")
-    init_db()
-    print("  ✅ 数据库表创建完成")
+    start = time.perf_counter()
     
-    # 获取数据库会话
-    db = SessionLocal()
+    if args.dry_run:
+        # 不执行 init_db()：建表、建索引、安装触发器和合并重名二级分类都会写入数据库
+        tables = {t.name for t in (Category.__table__, CategoryItem.__table__, PaymentMethod.__table__)}
+        missing = tables - set(inspect(engine).get_table_names()) if os.path.exists(DB_PATH) else tables
+        if missing:
+            print(f"  ℹ️  数据库表尚未创建（{', '.join(sorted(missing))}），执行初始化时将创建表并写入全部默认数据")
+            print("  ℹ️  dry-run，未写入数据库")
+            return
+    else:
+        # 初始化数据库表（已有的库补建索引）
+        print("📊 正在创建数据库表...")
+        init_db()
+        print("  ✅ 数据库表创建完成")
     
     try:
-        # 插入分类
-        print()
-        print("📂 正在插入分类数据...")
-        items_count = seed_categories(db)
-        print(f"  ✅ 插入 {items_count} 个二级分类")
-        
-        # 插入支付方式
-        print()
-        print("💳 正在插入支付方式...")
-        pm_count = seed_payment_methods(db)
-        print(f"  ✅ 插入 {pm_count} 个支付方式")
-        
-        # 提交事务
-        db.commit()
-        
-        # 统计
-        cat_count = db.query(Category).count()
-        item_count = db.query(CategoryItem).count()
-        pm_count = db.query(PaymentMethod).count()
-        
-        print()
-        print("=" * 50)
-        print("  ✅ 初始化完成!")
-        print()
-        print(f"  📂 一级分类: {cat_count} 个")
-        print(f"  📝 二级分类: {item_count} 个")
-        print(f"  💳 支付方式: {pm_count} 个")
-        print("=" * 50)
-        
+        with engine.begin() as conn:
+            changes = diff(conn, args.reset)
+            print()
+            print_changes(changes)
+            
+            if not args.dry_run:
+                seed(conn, args.reset)
+            
+            cat_count = conn.execute(select(func.count()).select_from(Category)).scalar()
+            item_count = conn.execute(select(func.count()).select_from(CategoryItem)).scalar()
+            pm_count = conn.execute(select(func.count()).select_from(PaymentMethod)).scalar()
     except Exception as e:
-        db.rollback()
         print(f"  ❌ 错误: {e}")
         raise
-    finally:
-        db.close()
+    
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    print()
+    print("=" * 50)
+    print("  ✅ 初始化完成!" if not args.dry_run else "  ℹ️  dry-run，未写入数据库")
+    print()
+    print(f"  📂 一级分类: {cat_count} 个")
+    print(f"  📝 二级分类: {item_count} 个")
+    print(f"  💳 支付方式: {pm_count} 个")
+    print(f"  ⏱️  耗时: {elapsed:.1f} ms")
+    print("=" * 50)
 
 
 if __name__ == "__main__":
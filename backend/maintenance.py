@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库维护
+直接执行 app/maintenance.py 中的维护项目（不经过后台任务队列，服务运行中也可执行），
+输出各项耗时和空间变化；服务运行时这些项目会按 MAINTENANCE_*_SECONDS 自动执行
+
+用法:
+    python maintenance.py                          # 执行全部例行维护
+    python maintenance.py optimize checkpoint      # 只执行指定项目
+    python maintenance.py --status                 # 只显示空间占用和各项最近一次成功执行时间
+    python maintenance.py --full-vacuum            # 完整 VACUUM，并转换为可增量回收（阻塞写入）
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# 添加后端路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.exc import OperationalError
+
+from app.database import DB_PATH, SessionLocal, engine, init_db
+from app.maintenance import TASKS, full_vacuum, last_runs, run_task, space_stats
+
+AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+
+def print_status():
+    with engine.connect() as conn:
+        stats = space_stats(conn)
+    db = SessionLocal()
+    try:
+        last = last_runs(db)
+    except OperationalError:
+        # 尚未创建 maintenance_runs 表（服务未以当前版本启动过）
+        last = {}
+    finally:
+        db.close()
+    print(f"数据库: {DB_PATH}")
+    print(f"  文件 {stats.db_bytes / 1024:.1f} KB, WAL {stats.wal_bytes / 1024:.1f} KB")
+    print(f"  {stats.page_count} 页 × {stats.page_size} 字节, 空闲 {stats.freelist_count} 页"
+          f" ({stats.freelist_count * stats.page_size / 1024:.1f} KB)")
+    print(f"  auto_vacuum: {AUTO_VACUUM_MODES.get(stats.auto_vacuum, stats.auto_vacuum)}")
+    print("最近一次成功执行 / 最近一次登记 (UTC):")
+    for name in TASKS:
+        run = last.get(name)
+        succeeded = f"{run.succeeded_at:%Y-%m-%d %H:%M:%S}" if run and run.succeeded_at else "-"
+        enqueued = f"{run.enqueued_at:%Y-%m-%d %H:%M:%S}" if run and run.enqueued_at else "-"
+        print(f"  {name:<16} {succeeded:<19}  {enqueued}")
+
+
+def print_result(result: dict):
+    print(f"{result['task']:<16} {result['seconds'] * 1000:>9.1f} ms  释放 {result['reclaimed_bytes'] / 1024:>9.1f} KB"
+          + (f"  {result['detail']}" if "detail" in result else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 数据库维护")
+    parser.add_argument("tasks", nargs="*", metavar="task",
+                        help=f"维护项目（默认全部）: {', '.join(TASKS)}")
+    parser.add_argument("--status", action="store_true", help="只显示空间占用和各项最近一次成功执行时间")
+    parser.add_argument("--full-vacuum", action="store_true",
+                        help="完整 VACUUM 并转换为 auto_vacuum=INCREMENTAL（重写整个文件，执行期间阻塞写入）")
+    args = parser.parse_args()
+    unknown = [name for name in args.tasks if name not in TASKS]
+    if unknown:
+        parser.error(f"未知的维护项目: {', '.join(unknown)}")
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    if not os.path.exists(DB_PATH):
+        sys.exit(f"数据库不存在: {DB_PATH}")
+    if args.status:
+        # 只读: 不创建或迁移表结构
+        print_status()
+        return
+    init_db()
+
+    failed = False
+    if args.full_vacuum:
+        print_result(full_vacuum())
+    for name in args.tasks or ([] if args.full_vacuum else list(TASKS)):
+        try:
+            print_result(run_task(name))
+        except Exception as e:
+            failed = True
+            print(f"{name:<16} 失败: {e}")
+    print()
+    print_status()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
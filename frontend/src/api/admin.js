@@ -45,6 +45,14 @@ const adminApi = {
     return api.delete(`/admin/categories/${id}`)
   },
 
+  async reorderCategories(ids) {
+    return api.put('/admin/categories/reorder', { ids })
+  },
+
+  async bulkCategories(ops) {
+    return api.post('/admin/categories/bulk', ops)
+  },
+
   async getCategoryItems(categoryId = null) {
     return api.get('/admin/category-items', { category_id: categoryId })
   },
@@ -57,6 +65,14 @@ const adminApi = {
     return api.delete(`/admin/category-items/${id}`)
   },
 
+  async reorderCategoryItems(ids) {
+    return api.put('/admin/category-items/reorder', { ids })
+  },
+
+  async bulkCategoryItems(ops) {
+    return api.post('/admin/category-items/bulk', ops)
+  },
+
   async getPaymentMethods() {
     return api.get('/admin/payment-methods')
   },
@@ -69,6 +85,14 @@ const adminApi = {
     return api.delete(`/admin/payment-methods/${id}`)
   },
 
+  async reorderPaymentMethods(ids) {
+    return api.put('/admin/payment-methods/reorder', { ids })
+  },
+
+  async bulkPaymentMethods(ops) {
+    return api.post('/admin/payment-methods/bulk', ops)
+  },
+
   async getProjects(status = null, page = 1, pageSize = 20) {
     return api.get('/admin/projects', { status, page, page_size: pageSize })
   },
@@ -13,6 +13,14 @@ const projectApi = {
     return api.get(`/projects/${id}`)
   },
 
+  async getRecords(id, cursor = null, limit = 20) {
+    return api.get(`/projects/${id}/records`, { cursor, limit })
+  },
+
+  async getBurndown(id) {
+    return api.get(`/projects/${id}/burndown`)
+  },
+
   async create(data) {
     return api.post('/projects', data)
   },
@@ -23,6 +23,15 @@ const statisticsApi = {
 
   async getTrend(period = 'month') {
     return api.get('/statistics/trend', { period })
+  },
+
+  /**
+   * 打开统计实时推送
+   * EventSource 无法设置请求头，先换取只能用于推送、有效期很短的令牌放在 URL 中，不暴露登录令牌
+   */
+  async openStream() {
+    const response = await api.post('/statistics/stream-token')
+    return new EventSource(`/api/v1/statistics/stream?token=${encodeURIComponent(response.data.token)}`)
   }
 }
 
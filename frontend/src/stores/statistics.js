@@ -5,6 +5,16 @@
 import { defineStore } from 'pinia'
 import statisticsApi from '@/api/statistics'
 
+// 收到变更后等待的时间（毫秒），合并短时间内的多次变更为一次刷新
+const RELOAD_DELAY = 300
+// 推送连接断开后重新获取令牌并重连的等待时间（毫秒）
+const RECONNECT_DELAY = 3000
+
+let stream = null
+let subscription = null
+let reloadTimer = null
+let reconnectTimer = null
+
 export const useStatisticsStore = defineStore('statistics', {
   // ============ 状态 ============
   state: () => ({
@@ -138,6 +148,89 @@ export const useStatisticsStore = defineStore('statistics', {
       this.loading = false
     },
 
+    /**
+     * 订阅统计实时推送，记录变更影响当前筛选范围时刷新（替代轮询）
+     * @param {Function} onReload - 刷新完成后的回调（如更新图表）
+     */
+    subscribe(onReload) {
+      this.unsubscribe()
+      const current = subscription = {}
+      let reconnecting = false
+      const scheduleReload = () => {
+        clearTimeout(reloadTimer)
+        reloadTimer = setTimeout(async () => {
+          await this.loadAll()
+          onReload?.()
+        }, RELOAD_DELAY)
+      }
+      const retry = () => {
+        if (subscription !== current) return
+        reconnecting = true
+        reconnectTimer = setTimeout(connect, RECONNECT_DELAY)
+      }
+
+      const connect = async () => {
+        let source
+        try {
+          source = await statisticsApi.openStream()
+        } catch (error) {
+          retry()
+          return
+        }
+        if (subscription !== current) {
+          source.close()
+          return
+        }
+        stream = source
+        // 首次连接的首个汇总只用于同步；重连后的首个汇总以及之后的汇总表示期间有其他来源的变更
+        let synced = !reconnecting
+        source.addEventListener('summary', () => {
+          if (!synced) {
+            synced = true
+          } else {
+            scheduleReload()
+          }
+        })
+        source.addEventListener('delta', (event) => {
+          const { record, previous } = JSON.parse(event.data)
+          if (this.matchesFilters(record) || this.matchesFilters(previous)) {
+            scheduleReload()
+          }
+        })
+        // 推送令牌有效期很短，不使用浏览器的自动重连（同一个 URL），而是重新获取令牌
+        source.onerror = () => {
+          source.close()
+          retry()
+        }
+      }
+      connect()
+    },
+
+    /**
+     * 关闭统计实时推送
+     */
+    unsubscribe() {
+      subscription = null
+      clearTimeout(reloadTimer)
+      clearTimeout(reconnectTimer)
+      stream?.close()
+      stream = null
+    },
+
+    /**
+     * 记录是否在当前筛选范围内
+     * @param {Object|null} record - 推送中的记录（日期为 YYYY-MM-DD）
+     */
+    matchesFilters(record) {
+      if (!record) return false
+      const { start_date, end_date, type, category_id } = this.filters
+      if (start_date && record.date < start_date) return false
+      if (end_date && record.date > end_date) return false
+      if (type && record.type !== type) return false
+      if (category_id && record.category_id !== Number(category_id)) return false
+      return true
+    },
+
     /**
      * 设置筛选条件
      * @param {Object} filters - 筛选条件